@@ -1,7 +1,8 @@
 'use client';
 // Force rebuild: v5
+import { useEffect, useState } from 'react';
 import { HeatmapText, HeatmapLegend } from './heatmap-text';
-import { AlertTriangle, CheckCircle, Tag, ChevronDown } from 'lucide-react';
+import { AlertTriangle, CheckCircle, Tag, ChevronDown, Loader2 } from 'lucide-react';
 
 interface Signal {
     name: string;
@@ -14,6 +15,21 @@ interface LinguisticAnalysisProps {
     signals: Signal[];
     heatmap: any[];
     riskScore: number;
+    // Analyzed text: lets the heatmap be fetched on demand when the result has none
+    text?: string;
+    autoLoad?: boolean;
+}
+
+const SALIENCY_METHODS = [
+    { id: 'gradient', label: 'Gradient', hint: 'Most precise; one backward pass' },
+    { id: 'attention', label: 'Attention', hint: 'Fastest; forward pass only' },
+    { id: 'occlusion', label: 'Occlusion', hint: 'Masks each token; several batched forward passes' },
+];
+
+interface HeatmapCost {
+    ms: number;
+    forward_passes: number;
+    backward_passes: number;
 }
 
 function getSignalPillLabel(name: string): string {
@@ -43,8 +59,43 @@ function getVerdictText(verdict: string, riskScore: number): string {
     return "Neutral, objective language.";
 }
 
-export function LinguisticAnalysis({ verdict, signals, heatmap, riskScore }: LinguisticAnalysisProps) {
-    if (!heatmap || heatmap.length === 0) return null;
+export function LinguisticAnalysis({ verdict, signals, heatmap, riskScore, text, autoLoad }: LinguisticAnalysisProps) {
+    const [tokens, setTokens] = useState<any[]>(heatmap || []);
+    const [method, setMethod] = useState<string | null>(heatmap?.length ? 'gradient' : null);
+    const [cost, setCost] = useState<HeatmapCost | null>(null);
+    const [cached, setCached] = useState(false);
+    const [loadingHeatmap, setLoadingHeatmap] = useState(false);
+    const [heatmapError, setHeatmapError] = useState('');
+
+    const loadHeatmap = async (nextMethod: string) => {
+        if (!text) return;
+        setLoadingHeatmap(true);
+        setHeatmapError('');
+        try {
+            const res = await fetch('/api/heatmap', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ text, method: nextMethod }),
+            });
+            if (!res.ok) throw new Error((await res.json().catch(() => ({}))).detail || 'Heatmap request failed');
+            const data = await res.json();
+            setTokens(data.heatmap || []);
+            setMethod(nextMethod);
+            setCost(data.cost || null);
+            setCached(!!data.cached);
+        } catch (err: any) {
+            setHeatmapError(err.message || 'Heatmap request failed');
+        } finally {
+            setLoadingHeatmap(false);
+        }
+    };
+
+    useEffect(() => {
+        if (autoLoad && text && !heatmap?.length) loadHeatmap('gradient');
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [autoLoad, text]);
+
+    if (!tokens.length && !text) return null;
 
     const isNeutral = riskScore < 30;
     const VerdictIcon = isNeutral ? CheckCircle : AlertTriangle;
@@ -113,9 +164,44 @@ export function LinguisticAnalysis({ verdict, signals, heatmap, riskScore }: Lin
 
             {/* Annotated Text */}
             <div className="pt-4 border-t border-gray-100">
-                <div className="text-xs font-medium text-gray-400 uppercase tracking-wide mb-3">Annotated Text</div>
-                <HeatmapText tokens={heatmap} overallRisk={riskScore} />
-                <HeatmapLegend overallRisk={riskScore} detectedSignals={displaySignals.map(s => s.name)} />
+                <div className="flex items-center justify-between gap-4 mb-3">
+                    <div className="text-xs font-medium text-gray-400 uppercase tracking-wide">Annotated Text</div>
+                    {text && (
+                        <div className="flex items-center gap-1">
+                            {SALIENCY_METHODS.map(m => (
+                                <button
+                                    key={m.id}
+                                    onClick={() => loadHeatmap(m.id)}
+                                    disabled={loadingHeatmap}
+                                    title={m.hint}
+                                    className={`px-2 py-0.5 text-xs rounded border transition-colors disabled:opacity-50 ${method === m.id
+                                        ? 'bg-gray-900 text-white border-gray-900'
+                                        : 'bg-white text-gray-600 border-gray-200 hover:border-gray-400'}`}
+                                >
+                                    {m.label}
+                                </button>
+                            ))}
+                        </div>
+                    )}
+                </div>
+                {loadingHeatmap ? (
+                    <div className="flex items-center gap-2 text-sm text-gray-400">
+                        <Loader2 size={14} className="animate-spin" /> Computing token attributions...
+                    </div>
+                ) : tokens.length > 0 ? (
+                    <>
+                        <HeatmapText tokens={tokens} overallRisk={riskScore} />
+                        <HeatmapLegend overallRisk={riskScore} detectedSignals={displaySignals.map(s => s.name)} />
+                        {cost && (
+                            <p className="text-xs text-gray-400 mt-2">
+                                {method} saliency: {Math.round(cost.ms)} ms, {cost.forward_passes} forward / {cost.backward_passes} backward pass{cost.backward_passes === 1 ? '' : 'es'}{cached ? ' (cached)' : ''}
+                            </p>
+                        )}
+                    </>
+                ) : (
+                    <p className="text-sm text-gray-400">Choose a method to see which words drove the linguistic score.</p>
+                )}
+                {heatmapError && <p className="text-xs text-red-600 mt-2">{heatmapError}</p>}
             </div>
         </section>
     );
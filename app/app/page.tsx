@@ -14,17 +14,70 @@ export default function Home() {
   const [jobId, setJobId] = useState<string | null>(null);
   const [completedJobId, setCompletedJobId] = useState<string | null>(null);
   const [analyzedText, setAnalyzedText] = useState<string>('');
+  const [stage, setStage] = useState<string>('');
+  const [partial, setPartial] = useState<{ styleRisk?: number; stances: number }>({ stances: 0 });
 
-  // Polling logic
+  // Progress stream (SSE); falls back to polling if the stream can't be kept open
   useEffect(() => {
-    let interval: NodeJS.Timeout;
+    if (!jobId) return;
 
-    if (jobId) {
-      interval = setInterval(() => {
-        pollStatus(jobId);
-      }, 2000);
-    }
-    return () => clearInterval(interval);
+    let interval: NodeJS.Timeout | undefined;
+    const source = new EventSource(`/api/stream/${jobId}`);
+
+    const finish = () => {
+      source.close();
+      setLoading(false);
+      setJobId(null);
+    };
+
+    const startPolling = () => {
+      source.close();
+      if (!interval) {
+        interval = setInterval(() => {
+          pollStatus(jobId);
+        }, 2000);
+      }
+    };
+    // Reconnects that keep failing (proxy dropping the stream) give up on SSE too
+    let errors = 0;
+
+    source.addEventListener('stylometry', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setPartial((p) => ({ ...p, styleRisk: data.style_risk_score }));
+      setStage('Language analyzed');
+    });
+    source.addEventListener('heatmap', () => setStage('Highlighting loaded language'));
+    source.addEventListener('retrieval', () => setStage('Searching the evidence index'));
+    source.addEventListener('fetch_started', () => setStage('Fetching live sources'));
+    source.addEventListener('stance', () => {
+      setPartial((p) => ({ ...p, stances: p.stances + 1 }));
+      setStage('Weighing evidence');
+    });
+    source.addEventListener('final', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setResult(data.result);
+      setCompletedJobId(jobId);
+      finish();
+    });
+    source.addEventListener('failed', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setError(data.error || 'Analysis failed');
+      finish();
+    });
+    // The server gave up waiting (job still running): poll from here on
+    source.addEventListener('timeout', startPolling);
+    source.onerror = () => {
+      // Transient drops reconnect on their own (resuming via Last-Event-ID)
+      errors += 1;
+      if (source.readyState === EventSource.CLOSED || errors >= 3) {
+        startPolling();
+      }
+    };
+
+    return () => {
+      source.close();
+      if (interval) clearInterval(interval);
+    };
   }, [jobId]);
 
   const pollStatus = async (id: string) => {
@@ -55,6 +108,8 @@ export default function Home() {
     setResult(null);
     setJobId(null);
     setAnalyzedText(text);
+    setStage('');
+    setPartial({ stances: 0 });
 
     try {
       const res = await fetch('/api/analyze', {
@@ -149,7 +204,13 @@ export default function Home() {
             <div className="h-1 w-24 bg-gray-100 overflow-hidden rounded-full">
               <div className="h-full bg-gray-900 animate-progress origin-left w-full"></div>
             </div>
-            <span className="text-xs font-semibold text-gray-400 tracking-widest uppercase">Investigating Sources...</span>
+            <span className="text-xs font-semibold text-gray-400 tracking-widest uppercase">{stage || 'Investigating Sources'}...</span>
+            {partial.styleRisk !== undefined && (
+              <span className="text-xs text-gray-500">
+                Language risk {Math.round(partial.styleRisk)}
+                {partial.stances > 0 && ` · ${partial.stances} source${partial.stances === 1 ? '' : 's'} assessed`}
+              </span>
+            )}
           </div>
         )}
 
@@ -180,6 +241,7 @@ export default function Home() {
                   signals={result.linguistic_signals}
                   heatmap={result.heatmap}
                   riskScore={result.style_risk_score}
+                  text={analyzedText}
                 />
               </div>
 
@@ -113,6 +113,8 @@ export default function ReportPage() {
                     signals={result.linguistic_signals}
                     heatmap={result.heatmap}
                     riskScore={result.style_risk_score}
+                    text={result.text}
+                    autoLoad
                 />
 
                 {/* 5. Evidence Sections (Narrative Grouping) */}
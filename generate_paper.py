@@ -19,6 +19,23 @@ import numpy as np
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+import json
+
+# Per-stage p50/p95/p99 written by `python -m ml.benchmarks.stages`
+LATENCY_FILE = os.getenv("STAGE_LATENCY_FILE", "stage_latency.json")
+STAGE_LABELS = {
+    'stylometry_heuristic': 'Heuristic Stylometry',
+    'stylometry': 'RoBERTa Stylometry',
+    'xai': 'XAI Heatmap (gradient)',
+    'xai_attention': 'XAI Heatmap (attention)',
+    'xai_occlusion': 'XAI Heatmap (occlusion)',
+    'embedding': 'Embedding',
+    'retrieval': 'Vector Search',
+    'fetch_parse': 'RSS Fetch & Parse',
+    'safety': 'Safety Check',
+    'nli_per_item': 'NLI (per item)',
+    'aggregation': 'Aggregation',
+}
 
 def create_charts():
     # Chart 1: Stylometric Signals Comparison
@@ -44,14 +61,37 @@ def create_charts():
     plt.close('all')
 
     # Chart 2: Pipelined Latency Breaddown
-    plt.figure(figsize=(7, 7))
-    stages = ['Gateway & Queuing', 'RoBERTa Inference', 'NLI Stance Class.', 'ChromaDB Search', 'Agentic Web Fetch']
-    latencies = [0.05, 0.45, 0.35, 0.15, 2.5] # in seconds
-    colors = ['#f1c40f', '#e67e22', '#e74c3c', '#9b59b6', '#34495e']
-    explode = (0, 0, 0, 0, 0.1)
-    
-    plt.pie(latencies, explode=explode, labels=stages, colors=colors, autopct='%1.1f%%', shadow=True, startangle=140)
-    plt.title('Average Processing Latency per Stage (Agentic Fallback Included)')
+    if os.path.exists(LATENCY_FILE):
+        # Measured by `python -m ml.benchmarks.stages`
+        with open(LATENCY_FILE) as f:
+            measured = json.load(f)["stages"]
+        stages = [STAGE_LABELS.get(name, name) for name in measured]
+        p50 = [measured[name]['p50_ms'] for name in measured]
+        p95 = [measured[name]['p95_ms'] for name in measured]
+        p99 = [measured[name]['p99_ms'] for name in measured]
+        
+        x = np.arange(len(stages))
+        width = 0.27
+        fig, ax = plt.subplots(figsize=(9, 5))
+        ax.bar(x - width, p50, width, label='p50', color='#3498db')
+        ax.bar(x, p95, width, label='p95', color='#e67e22')
+        ax.bar(x + width, p99, width, label='p99', color='#e74c3c')
+        ax.set_yscale('log')
+        ax.set_ylabel('Latency (ms, log scale)')
+        ax.set_title('Measured Processing Latency per Stage')
+        ax.set_xticks(x)
+        ax.set_xticklabels(stages, rotation=20, ha='right')
+        ax.legend()
+    else:
+        print(f"{LATENCY_FILE} not found: plotting illustrative latencies (run `python -m ml.benchmarks.stages`)")
+        plt.figure(figsize=(7, 7))
+        stages = ['Gateway & Queuing', 'RoBERTa Inference', 'NLI Stance Class.', 'ChromaDB Search', 'Agentic Web Fetch']
+        latencies = [0.05, 0.45, 0.35, 0.15, 2.5] # in seconds
+        colors = ['#f1c40f', '#e67e22', '#e74c3c', '#9b59b6', '#34495e']
+        explode = (0, 0, 0, 0, 0.1)
+        
+        plt.pie(latencies, explode=explode, labels=stages, colors=colors, autopct='%1.1f%%', shadow=True, startangle=140)
+        plt.title('Average Processing Latency per Stage (Agentic Fallback Included)')
     plt.tight_layout()
     plt.savefig('latency_chart.png', dpi=300)
     plt.close('all')
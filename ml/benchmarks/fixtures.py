@@ -0,0 +1,155 @@
+"""
+Offline stand-ins for the benchmark suite: an in-memory vector store with the slice of
+the Chroma API the pipeline uses, and canned Google News RSS / Fact Check API payloads
+served through an httpx mock transport.
+"""
+import json
+
+import numpy as np
+
+CLAIMS = [
+    "The Earth is flat.",
+    "5G networks spread COVID-19.",
+    "Vaccines alter human DNA.",
+    "Climate change is caused by human activity.",
+    "Russia attacked Ukraine.",
+    "SHOCKING: they don't want you to know the truth about the ice wall!!!",
+    "The moon landing was staged in a Hollywood studio.",
+    "Drinking bleach cures viral infections.",
+]
+
+NEWS_ITEMS = [
+    ("NASA releases new images confirming Earth's curvature from orbit", "https://www.nasa.gov/earth-images", "NASA"),
+    ("Fact check: No link between 5G rollout and coronavirus spread", "https://www.reuters.com/fact-check-5g", "Reuters"),
+    ("mRNA vaccines do not change your DNA, scientists explain", "https://apnews.com/mrna-dna", "AP News"),
+    ("IPCC report: human influence has warmed the climate", "https://www.bbc.com/news/ipcc-report", "BBC"),
+    ("Russian forces launch full-scale invasion of Ukraine", "https://www.reuters.com/world/europe/invasion", "Reuters"),
+    ("Flat Earth conference draws hundreds despite evidence", "https://www.theguardian.com/flat-earth", "The Guardian"),
+    ("Apollo 11 moon landing: the evidence that it happened", "https://www.space.com/apollo-11-evidence", "Space.com"),
+    ("Health officials warn against drinking disinfectants", "https://www.cdc.gov/disinfectant-warning", "CDC"),
+    ("Ukraine war: overnight missile strikes hit Kyiv", "https://www.bbc.com/news/kyiv-strikes", "BBC"),
+    ("Study finds no evidence radio waves transmit viruses", "https://www.who.int/5g-myth", "WHO"),
+]
+
+FACTCHECK_CLAIMS = [
+    ("The Earth is an oblate spheroid, not flat. Satellite imagery and physics prove this.",
+     "https://www.nasa.gov/topics/earth/index.html", "NASA"),
+    ("There is no evidence that 5G networks cause COVID-19. Viruses cannot travel on radio waves.",
+     "https://www.who.int/myth-busters", "WHO"),
+    ("Vaccines differ from gene therapy and do not alter human DNA.",
+     "https://www.cdc.gov/vaccines/facts.html", "CDC"),
+    ("Climate change is real and primarily caused by human activities like burning fossil fuels.",
+     "https://climate.nasa.gov/evidence/", "NASA"),
+    ("Russia began a full-scale invasion of Ukraine on 24 February 2022.",
+     "https://www.factcheck.org/ukraine-invasion", "FactCheck.org"),
+    ("The Apollo moon landings were real; independent observatories tracked the missions.",
+     "https://www.snopes.com/apollo-hoax", "Snopes"),
+    ("Ingesting bleach or disinfectant is dangerous and does not cure infections.",
+     "https://www.fda.gov/bleach-warning", "FDA"),
+    ("Lunar eclipses cast a round shadow on the Moon, which is only possible if the Earth is round.",
+     "https://www.space.com/15684-lunar-eclipses.html", "Space.com"),
+]
+
+
+def rss_feed(items=NEWS_ITEMS):
+    entries = "".join(
+        f"<item><title>{title}</title><link>{url}</link>"
+        f"<pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate><source>{source}</source></item>"
+        for title, url, source in items
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>{entries}</channel></rss>'
+
+
+def factcheck_pages(claims=FACTCHECK_CLAIMS, page_size=4):
+    """Fact Check API responses, chained with nextPageToken."""
+    pages = []
+    for start in range(0, len(claims), page_size):
+        page = {"claims": [
+            {"text": text, "claimant": source, "claimReview": [{"url": url, "title": source}]}
+            for text, url, source in claims[start:start + page_size]
+        ]}
+        if start + page_size < len(claims):
+            page["nextPageToken"] = str(start + page_size)
+        pages.append(page)
+    return pages
+
+
+def mock_transport():
+    """httpx transport answering Google News RSS and Fact Check API requests from the canned payloads."""
+    import httpx
+
+    feed = rss_feed().encode("utf-8")
+    pages = factcheck_pages()
+
+    def handler(request):
+        if request.url.host == "news.google.com":
+            return httpx.Response(200, content=feed, headers={"content-type": "application/rss+xml"})
+        if request.url.host == "factchecktools.googleapis.com":
+            token = request.url.params.get("pageToken")
+            index = 0 if token is None else int(token) // len(pages[0]["claims"])
+            return httpx.Response(200, content=json.dumps(pages[index]))
+        return httpx.Response(404)
+
+    return httpx.MockTransport(handler)
+
+
+class InMemoryCollection:
+    """Brute-force stand-in for a Chroma collection (squared L2, Chroma's default space)."""
+
+    def __init__(self, name="claims"):
+        self.name = name
+        self.metadata = {"hnsw:space": "l2"}
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.embeddings = np.zeros((0, 0), dtype=np.float32)
+
+    def upsert(self, ids, documents, embeddings, metadatas=None):
+        metadatas = metadatas or [{} for _ in ids]
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if not len(self.ids):
+            self.embeddings = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        for i, doc_id in enumerate(ids):
+            if doc_id in self.ids:
+                j = self.ids.index(doc_id)
+                self.documents[j], self.metadatas[j] = documents[i], metadatas[i]
+                self.embeddings[j] = vectors[i]
+            else:
+                self.ids.append(doc_id)
+                self.documents.append(documents[i])
+                self.metadatas.append(metadatas[i])
+                self.embeddings = np.vstack([self.embeddings, vectors[i:i + 1]])
+
+    add = upsert
+
+    def count(self):
+        return len(self.ids)
+
+    def get(self, ids=None, include=None):
+        rows = range(len(self.ids)) if ids is None else [self.ids.index(i) for i in ids if i in self.ids]
+        return {
+            "ids": [self.ids[j] for j in rows],
+            "documents": [self.documents[j] for j in rows],
+            "metadatas": [self.metadatas[j] for j in rows],
+        }
+
+    def query(self, query_embeddings, n_results=10, include=None):
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for q in np.asarray(query_embeddings, dtype=np.float32):
+            distances = ((self.embeddings - q) ** 2).sum(axis=1)
+            order = np.argsort(distances)[:n_results]
+            result["ids"].append([self.ids[j] for j in order])
+            result["documents"].append([self.documents[j] for j in order])
+            result["metadatas"].append([self.metadatas[j] for j in order])
+            result["distances"].append([float(distances[j]) for j in order])
+        return result
+
+
+class InMemoryClient:
+    def __init__(self):
+        self.collections = {}
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collections.setdefault(name, InMemoryCollection(name))
+
+    create_collection = get_or_create_collection
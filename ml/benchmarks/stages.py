@@ -0,0 +1,191 @@
+"""
+Per-stage latency microbenchmarks for the analysis pipeline, fully offline.
+
+Each stage of analyze_text_task is timed in isolation on the real models, with an
+in-memory vector store seeded from canned Fact Check / RSS payloads instead of
+ChromaDB and the network (see fixtures.py). Model stages are timed uncached.
+
+Stages: stylometry_heuristic (STYLOMETRY_TIER=heuristic, no model), stylometry (with the
+RoBERTa forward pass), xai / xai_attention / xai_occlusion (the three saliency methods),
+embedding, retrieval (query embedding cached, so this is the vector search alone),
+fetch_parse (RSS streaming parse), safety, nli_per_item (relevance + stance pair per
+evidence item) and aggregation.
+
+Usage:
+    python -m ml.benchmarks.stages                          # -> stage_latency.json
+    python -m ml.benchmarks.stages --iterations 100 --output results/stage_latency.json
+
+The JSON (p50/p95/p99/mean in ms per stage) is what generate_paper.py plots.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+
+# Offline: every cache stays in-process
+os.environ["REDIS_URL"] = ""
+
+import numpy as np
+
+from ml.benchmarks import fixtures
+from ml.core import resources
+
+STAGES = ["stylometry_heuristic", "stylometry", "xai", "xai_attention", "xai_occlusion", "embedding", "retrieval", "fetch_parse", "safety", "nli_per_item", "aggregation"]
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "n": len(ms),
+    }
+
+
+def timed(fn, *args, per=1):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - start) / per
+
+
+def fetch_news(text):
+    import httpx
+    from ml.core.news_fetcher import NewsFetcher
+
+    async def run():
+        async with httpx.AsyncClient(transport=fixtures.mock_transport()) as client:
+            return await NewsFetcher().search_news_async(text, max_results=30, client=client)
+    return asyncio.run(run())
+
+
+def seed_store(encoder):
+    """Install the in-memory store as the shared Chroma client and fill it from the canned payloads."""
+    host, port = os.getenv("CHROMA_HOST", "127.0.0.1"), int(os.getenv("CHROMA_PORT", 8000))
+    client = fixtures.InMemoryClient()
+    resources.register(("chroma_client", host, port), client)
+
+    docs = [(c["text"], c["claimReview"][0]["url"]) for page in fixtures.factcheck_pages() for c in page["claims"]]
+    docs += [(item["text"], item["claimReview"][0]["url"]) for item in fetch_news(fixtures.CLAIMS[0])]
+    collection = client.get_or_create_collection("claims")
+    collection.upsert(
+        ids=[f"doc_{i}" for i in range(len(docs))],
+        documents=[text for text, _ in docs],
+        embeddings=encoder.encode([text for text, _ in docs]),
+        metadatas=[{"source_url": url} for _, url in docs]
+    )
+    return collection.count()
+
+
+def evidence_output(nli, claim, evidence):
+    """What evidence_stage hands to the aggregator, built from real stance predictions."""
+    relevance, stances = nli.score_batch(claim, [ev["text"] for ev in evidence])
+    scored = []
+    for ev, (is_relevant, score), stance in zip(evidence, relevance, stances):
+        if is_relevant:
+            scored.append(dict(ev, relevance_score=score, stance=stance, credibility={}))
+    counts = {label: sum(1 for ev in scored if ev["stance"]["label"] == label)
+              for label in ("supports", "refutes", "neutral")}
+    return {
+        "evidence": scored,
+        "stance_summary": counts,
+        "quality_note": "Verified",
+        "insufficient_evidence": not scored,
+        "is_safety_critical": False,
+        "evidence_stats": {"total_retrieved": len(evidence), "after_threshold": len(evidence),
+                           "skipped_irrelevant": len(evidence) - len(scored), "final_with_stance": len(scored)},
+        "nli_cache": {}, "embedding_cache": {}, "resources": {}, "fetch": None,
+    }
+
+
+def run(iterations, warmup, n_evidence):
+    from ml.core.nli import StanceClassifier, SAFETY_HYPOTHESIS
+    from ml.core.rag import EvidenceRetriever
+    from ml.core.stylometry import StylometricAnalyzer
+    from ml.core.xai import XAIExplainer
+    from ml.workers.tasks import aggregate_result
+
+    print("Loading models...")
+    stylometer = StylometricAnalyzer()
+    xai = XAIExplainer(stylometer)
+    nli = StanceClassifier()
+    cached_encoder = resources.get_embedding_model()
+    raw_encoder = cached_encoder.encoder
+    corpus_size = seed_store(raw_encoder)
+    retriever = EvidenceRetriever()
+    print(f"In-memory store seeded with {corpus_size} documents")
+
+    samples = {stage: [] for stage in STAGES}
+    claims = fixtures.CLAIMS
+    for i in range(warmup + iterations):
+        claim = claims[i % len(claims)]
+        record = i >= warmup
+
+        _, t_heuristic = timed(stylometer.analyze, claim, False)
+        style, t_style = timed(stylometer.analyze, claim, True)
+        _, t_xai = timed(xai.explain, claim)
+        _, t_attention = timed(xai.explain, claim, "attention")
+        _, t_occlusion = timed(xai.explain, claim, "occlusion")
+        _, t_embed = timed(raw_encoder.encode, claim)
+        cached_encoder.encode(claim)  # retrieval below measures the search, not the embedding
+        evidence, t_retrieve = timed(retriever.retrieve, claim)
+        _, t_fetch = timed(fetch_news, claim)
+        _, t_safety = timed(nli._run_pairs, [(claim, SAFETY_HYPOTHESIS)])
+
+        evidence = evidence[:n_evidence]
+        pairs = [(claim, ev["text"]) for ev in evidence] + [(ev["text"], claim) for ev in evidence]
+        _, t_nli = timed(nli._run_pairs, pairs, per=max(len(evidence), 1))
+
+        stage_out = evidence_output(nli, claim, evidence)
+        style_out = {"score": style["score"], "verdict": style["verdict"],
+                     "signals": style["signals"], "heatmap": []}
+        _, t_aggregate = timed(aggregate_result, claim, style_out, stage_out)
+
+        if record:
+            for stage, t in zip(STAGES, [t_heuristic, t_style, t_xai, t_attention, t_occlusion, t_embed, t_retrieve, t_fetch,
+                                         t_safety, t_nli, t_aggregate]):
+                samples[stage].append(t)
+        print(f"  iteration {i + 1}/{warmup + iterations}{' (warmup)' if not record else ''}")
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "iterations": iterations,
+            "warmup": warmup,
+            "evidence_per_claim": n_evidence,
+            "corpus_size": corpus_size,
+            "inference_backend": os.getenv("INFERENCE_BACKEND", "torch"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "stages": {stage: percentiles(samples[stage]) for stage in STAGES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline per-stage latency benchmarks.")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--evidence", type=int, default=10, help="Evidence items scored per claim")
+    parser.add_argument("--output", default="stage_latency.json")
+    args = parser.parse_args()
+
+    report = run(args.iterations, args.warmup, args.evidence)
+
+    print(f"\n{'stage':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<14}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Offline bulk analysis: run the full pipeline over a JSONL file of claims, no API or Celery.
+
+Claims are spread over a process pool; each process loads the models once. Results are
+written as they finish (JSONL, or Parquet part files) and every finished claim id is
+appended to a checkpoint file, so re-running the same command resumes where an
+interrupted run stopped. Failed claims go to <output>.errors.jsonl and are retried on
+the next run.
+
+Usage:
+    python -m ml.bulk_analyze claims.jsonl -o results.jsonl --workers 4
+    python -m ml.bulk_analyze claims.jsonl -o results.parquet --format parquet
+    python -m ml.bulk_analyze requests.jsonl -o out.jsonl --text-field body --id-field request_id
+
+Input lines are JSON objects (the claim is in --text-field, default "text") or plain
+strings. Claims without --id-field (default "id") are identified by their line number.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+
+def load_claims(path, text_field="text", id_field="id"):
+    claims = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {text_field: item}
+            text = str(item.get(text_field) or "").strip()
+            if not text:
+                print(f"Skipping line {line_no}: no '{text_field}'")
+                continue
+            claims.append({"id": str(item.get(id_field, line_no)), "text": text})
+    return claims
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+# --- Pool side ---
+
+def init_worker(threads):
+    import torch
+    from ml.workers.tasks import get_models
+
+    # Split the cores between processes instead of every process grabbing all of them
+    torch.set_num_threads(threads)
+    get_models()
+
+
+def analyze_claim(claim):
+    from ml.workers.tasks import run_pipeline
+
+    start = time.perf_counter()
+    try:
+        result = run_pipeline(claim["text"])
+        return claim, result, None, time.perf_counter() - start
+    except Exception as e:
+        return claim, None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+# --- Output ---
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, claim, result, seconds):
+        self.file.write(json.dumps({"id": claim["id"], "seconds": round(seconds, 3), "result": result}) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Buffers rows and writes each batch as a new part file in the output directory."""
+
+    def __init__(self, path, rows_per_part=100):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("Parquet output needs pyarrow (pip install pyarrow)")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self.rows = []
+        self.pending_ids = []
+
+    def write(self, claim, result, seconds):
+        # Degraded results (e.g. no evidence stage) may come without a stance summary
+        stance = result.get("stance_summary") or {}
+        self.rows.append({
+            "id": claim["id"],
+            "text": claim["text"],
+            "risk_score": result.get("risk_score"),
+            "quality_note": result.get("quality_note"),
+            "linguistic_verdict": result.get("linguistic_verdict"),
+            "supports": stance.get("supports", 0),
+            "refutes": stance.get("refutes", 0),
+            "neutral": stance.get("neutral", 0),
+            "seconds": round(seconds, 3),
+            "result": json.dumps(result),
+        })
+        self.pending_ids.append(claim["id"])
+        if len(self.rows) >= self.rows_per_part:
+            return self.flush()
+        return []
+
+    def flush(self):
+        """Write buffered rows; returns the ids that are now durable."""
+        if not self.rows:
+            return []
+        import pandas as pd
+
+        part = os.path.join(self.path, f"part-{time.time_ns()}.parquet")
+        pd.DataFrame(self.rows).to_parquet(part, index=False)
+        done, self.rows, self.pending_ids = self.pending_ids, [], []
+        return done
+
+    def close(self):
+        return self.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the PRISM pipeline over a JSONL file of claims.")
+    parser.add_argument("input", help="JSONL file of claims")
+    parser.add_argument("-o", "--output", required=True, help="results.jsonl, or a directory for --format parquet")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default=None,
+                        help="Output format (default: from the output extension)")
+    parser.add_argument("--workers", type=int, default=2, help="Pipeline processes (each loads the models)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.ckpt)")
+    parser.add_argument("--limit", type=int, help="Only process the first N pending claims")
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "jsonl")
+    checkpoint_path = args.checkpoint or f"{args.output.rstrip('/')}.ckpt"
+    errors_path = f"{args.output.rstrip('/')}.errors.jsonl"
+
+    claims = load_claims(args.input, args.text_field, args.id_field)
+    done = load_checkpoint(checkpoint_path)
+    pending = [c for c in claims if c["id"] not in done]
+    already = len(claims) - len(pending)
+    if args.limit:
+        pending = pending[:args.limit]
+    print(f"{len(claims)} claims, {already} already done, {len(pending)} to run on {args.workers} processes")
+    if not pending:
+        return
+
+    writer = ParquetWriter(args.output) if fmt == "parquet" else JsonlWriter(args.output)
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8")
+    errors = open(errors_path, "a", encoding="utf-8")
+
+    def mark_done(ids):
+        for claim_id in ids:
+            checkpoint.write(claim_id + "\n")
+        checkpoint.flush()
+        os.fsync(checkpoint.fileno())
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    # spawn: the parent never loads models, and CUDA does not survive fork
+    ctx = multiprocessing.get_context("spawn")
+    completed = failed = 0
+    start = time.perf_counter()
+    try:
+        with ctx.Pool(args.workers, initializer=init_worker, initargs=(threads,)) as pool:
+            for claim, result, error, seconds in pool.imap_unordered(analyze_claim, pending):
+                if error:
+                    failed += 1
+                    errors.write(json.dumps({"id": claim["id"], "error": error}) + "\n")
+                    errors.flush()
+                    print(f"FAILED {claim['id']}: {error}")
+                else:
+                    # Checkpoint only once the result itself is on disk
+                    durable = writer.write(claim, result, seconds)
+                    mark_done([claim["id"]] if fmt == "jsonl" else durable)
+                    completed += 1
+
+                n = completed + failed
+                if n % 10 == 0 or n == len(pending):
+                    elapsed = time.perf_counter() - start
+                    print(f"[{n}/{len(pending)}] {completed} ok, {failed} failed, "
+                          f"{n / elapsed:.2f} claims/sec")
+    except KeyboardInterrupt:
+        print("\nInterrupted: flushing; re-run the same command to resume.")
+    finally:
+        if fmt == "parquet":
+            mark_done(writer.close())
+        else:
+            writer.close()
+        checkpoint.close()
+        errors.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nDone: {completed} ok, {failed} failed in {elapsed:.1f}s "
+          f"({(completed + failed) / max(elapsed, 1e-9):.2f} claims/sec)")
+    print(f"Results: {args.output}  Checkpoint: {checkpoint_path}" + (f"  Errors: {errors_path}" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+# Separate DB so tests never touch real locks or client budgets
+REDIS_TEST_URL = os.getenv("REDIS_TEST_URL", "redis://localhost:6379/15")
+
+
+@pytest.fixture
+def r():
+    """Client for a live Redis (the Lua scripts need the real thing); skips without one."""
+    redis = pytest.importorskip("redis")
+    client = redis.Redis.from_url(REDIS_TEST_URL)
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        pytest.skip(f"No Redis at {REDIS_TEST_URL}")
+    yield client
+    client.close()
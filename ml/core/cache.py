@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies of a text share a cache key."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class TwoTierCache:
+    """
+    In-process LRU in front of an optional Redis tier.
+    Local entries are evicted least-recently-used once `max_entries` is reached;
+    Redis entries expire after `ttl` seconds. If Redis is unreachable the cache
+    keeps working in-process only.
+    """
+
+    def __init__(self, namespace, max_entries=10000, ttl=86400, redis_url=None,
+                 serialize=json.dumps, deserialize=json.loads):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.serialize = serialize
+        self.deserialize = deserialize
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_local = 0
+        self.hits_redis = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._redis = None
+        redis_url = redis_url if redis_url is not None else os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.from_url(redis_url)
+            except Exception as e:
+                print(f"Cache[{namespace}]: Redis tier disabled: {e}")
+
+    def _redis_key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def _put_local(self, key, value):
+        # Caller holds the lock
+        self._local[key] = value
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys):
+        """Return {key: value} for every key found in either tier."""
+        found = {}
+        remote = []
+        with self._lock:
+            for key in keys:
+                if key in self._local:
+                    self._local.move_to_end(key)
+                    found[key] = self._local[key]
+                    self.hits_local += 1
+                else:
+                    remote.append(key)
+
+        if remote and self._redis is not None:
+            try:
+                values = self._redis.mget([self._redis_key(k) for k in remote])
+            except Exception as e:
+                print(f"Cache[{self.namespace}]: Redis read failed: {e}")
+                values = [None] * len(remote)
+            with self._lock:
+                for key, raw in zip(remote, values):
+                    if raw is None:
+                        continue
+                    value = self.deserialize(raw)
+                    found[key] = value
+                    self._put_local(key, value)
+                    self.hits_redis += 1
+
+        with self._lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set_many(self, mapping):
+        if not mapping:
+            return
+        with self._lock:
+            for key, value in mapping.items():
+                self._put_local(key, value)
+
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for key, value in mapping.items():
+                    pipe.setex(self._redis_key(key), self.ttl, self.serialize(value))
+                pipe.execute()
+            except Exception as e:
+                print(f"Cache[{self.namespace}]: Redis write failed: {e}")
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def stats(self):
+        with self._lock:
+            hits = self.hits_local + self.hits_redis
+            total = hits + self.misses
+            return {
+                "hits_local": self.hits_local,
+                "hits_redis": self.hits_redis,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._local),
+                "hit_ratio": hits / total if total else 0.0
+            }
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+from ml.core.cache import TwoTierCache, text_hash
+
+
+def _to_bytes(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def _from_bytes(raw):
+    return np.frombuffer(raw, dtype=np.float32)
+
+
+class CachedEncoder:
+    """
+    Embedding cache in front of any encoder with a SentenceTransformer-style `encode`.
+    Keyed by model name + inference backend + normalized text; vectors are stored as compact
+    float32, in process and (unless EMBEDDING_CACHE_REDIS=0) in Redis with EMBEDDING_CACHE_TTL.
+    """
+
+    def __init__(self, encoder, model_name):
+        self.encoder = encoder
+        self.model_name = model_name
+        # Same as onnx_backend.backend_of, without pulling torch into processes that only proxy
+        self.backend = getattr(encoder, "backend", "torch")
+        use_redis = os.getenv("EMBEDDING_CACHE_REDIS", "1").lower() not in ("0", "false", "no")
+        self.cache = TwoTierCache(
+            namespace="emb:v1",
+            max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", 20000)),
+            ttl=int(os.getenv("EMBEDDING_CACHE_TTL", 7 * 86400)),
+            redis_url=None if use_redis else "",
+            serialize=_to_bytes,
+            deserialize=_from_bytes
+        )
+
+    def _key(self, text):
+        return f"{self.model_name}:{self.backend}:{text_hash(text)}"
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """Same shape contract as SentenceTransformer.encode: 1-D for a str, 2-D for a list."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        keys = [self._key(t) for t in texts]
+        cached = self.cache.get_many(keys)
+
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.encoder.encode(list(missing.values()), batch_size=batch_size)
+            fresh = {key: np.asarray(vec, dtype=np.float32) for key, vec in zip(missing, vectors)}
+            self.cache.set_many(fresh)
+            cached.update(fresh)
+
+        result = np.stack([cached[key] for key in keys])
+        return result[0] if single else result
@@ -0,0 +1,165 @@
+"""
+Keyword lexicons for stylometric signals and evidence routing, matched in one pass.
+
+Each `<category>.txt` in LEXICON_DIR holds one term per line (`#` starts a comment).
+All categories are compiled into a single Aho-Corasick automaton, so scanning a text
+costs one walk over its characters however many terms the lexicons hold.
+
+The files are re-checked at most every LEXICON_RELOAD_SECONDS; when one is added,
+removed or edited, the automaton is rebuilt and swapped in without a restart.
+"""
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+LEXICON_DIR = os.getenv("LEXICON_DIR", os.path.join(os.path.dirname(__file__), "lexicons"))
+LEXICON_RELOAD_SECONDS = float(os.getenv("LEXICON_RELOAD_SECONDS", 30))
+
+# start/end index into text.lower(); whole_word mirrors a regex \bterm\b match
+Hit = namedtuple("Hit", ["term", "category", "start", "end", "whole_word"])
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+def read_lexicons(directory):
+    """{category: [terms]} from the .txt files in `directory` (terms lowercased)."""
+    lexicons = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".txt"):
+            continue
+        terms = []
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            for line in f:
+                term = line.split("#", 1)[0].strip().lower()
+                if term:
+                    terms.append(term)
+        lexicons[name[:-4]] = terms
+    return lexicons
+
+
+class Automaton:
+    """Aho-Corasick automaton over {category: [terms]}."""
+
+    def __init__(self, lexicons):
+        self.lexicons = lexicons
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        for category, terms in lexicons.items():
+            for term in terms:
+                node = 0
+                for ch in term:
+                    nxt = self.goto[node].get(ch)
+                    if nxt is None:
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.out.append([])
+                        nxt = len(self.goto) - 1
+                        self.goto[node][ch] = nxt
+                    node = nxt
+                if (term, category) not in self.out[node]:
+                    self.out[node].append((term, category))
+
+        # Failure links, breadth first; each node also inherits the outputs of its fail node
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def scan(self, text):
+        """Every (overlapping) hit of every term in `text`, case-insensitive."""
+        text = text.lower()
+        goto, fail, out = self.goto, self.fail, self.out
+        hits = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for term, category in out[node]:
+                start, end = i - len(term) + 1, i + 1
+                whole_word = ((start == 0 or not _is_word_char(text[start - 1])) and
+                              (end == len(text) or not _is_word_char(text[end])))
+                hits.append(Hit(term, category, start, end, whole_word))
+        return hits
+
+    def terms(self, text, whole_word=False):
+        """{category: set of distinct terms found}; whole_word=True keeps only \\bterm\\b hits."""
+        found = {}
+        for hit in self.scan(text):
+            if hit.whole_word or not whole_word:
+                found.setdefault(hit.category, set()).add(hit.term)
+        return found
+
+
+class Lexicon:
+    """The automaton for one lexicon directory, rebuilt when its files change."""
+
+    def __init__(self, directory=LEXICON_DIR, reload_seconds=LEXICON_RELOAD_SECONDS):
+        self.directory = directory
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._automaton = None
+        self._signature = None
+        self._checked_at = 0.0
+
+    def _file_signature(self):
+        return tuple(
+            (name, os.stat(os.path.join(self.directory, name)).st_mtime_ns)
+            for name in sorted(os.listdir(self.directory)) if name.endswith(".txt")
+        )
+
+    def reload(self, force=False):
+        """Rebuild if the files changed (or `force`). A failed reload keeps the previous automaton."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                signature = self._file_signature()
+                if not force and signature == self._signature and self._automaton is not None:
+                    return self._automaton
+                automaton = Automaton(read_lexicons(self.directory))
+            except OSError as e:
+                if self._automaton is None:
+                    raise
+                print(f"Lexicon: Reload failed, keeping previous lexicons: {e}")
+                return self._automaton
+            if self._automaton is not None:
+                print(f"Lexicon: Reloaded {sum(len(t) for t in automaton.lexicons.values())} terms from {self.directory}")
+            self._automaton, self._signature = automaton, signature
+            return automaton
+
+    def automaton(self):
+        automaton = self._automaton
+        if automaton is None or time.monotonic() - self._checked_at >= self.reload_seconds:
+            return self.reload()
+        return automaton
+
+    def scan(self, text):
+        return self.automaton().scan(text)
+
+    def terms(self, text, whole_word=False):
+        return self.automaton().terms(text, whole_word)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_lexicon():
+    """Process-wide Lexicon for LEXICON_DIR."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = Lexicon()
+    return _default
@@ -1,6 +1,8 @@
-import requests
+import asyncio
+import httpx
 import xml.etree.ElementTree as ET
 from urllib.parse import quote_plus
+from ml import metrics
 
 class NewsFetcher:
     def __init__(self):
@@ -40,64 +42,105 @@ class NewsFetcher:
         return queries[:3]  # Max 3 search queries
 
     def search_news(self, query, max_results=30):
+        """
+        Synchronous wrapper around `search_news_async` for scripts and non-async callers.
+        """
+        return asyncio.run(self.search_news_async(query, max_results=max_results))
+
+    async def search_news_async(self, query, max_results=30, client=None, deadline=10):
         """
         Lane B: Access trusted news via Google News RSS.
-        Now uses multi-query expansion for broader coverage.
+        All expanded queries run concurrently over one pooled HTTP client; each has its own
+        `deadline` (seconds) and keeps whatever items were parsed before it expired.
         """
         print(f"NewsFetcher: Searching Google News RSS for '{query}' (max {max_results})...")
-        all_results = []
-        seen_links = set()  # Dedup across queries
-        
         search_queries = self._extract_key_terms(query)
         per_query_limit = max(10, max_results // len(search_queries))
+        # Enough items per query to fill its quota even if every earlier query's items repeat
+        parse_cap = per_query_limit * len(search_queries)
+        
+        own_client = client is None
+        if own_client:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(deadline),
+                limits=httpx.Limits(max_connections=len(search_queries)),
+                follow_redirects=True
+            )
+        try:
+            per_query_items = await asyncio.gather(*[
+                self._fetch_query(client, sq, parse_cap, deadline) for sq in search_queries
+            ])
+        finally:
+            if own_client:
+                await client.aclose()
         
-        for sq in search_queries:
-            try:
-                encoded_query = quote_plus(sq)
-                rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
-                
-                response = requests.get(rss_url, timeout=10)
-                if response.status_code != 200:
-                    print(f"NewsFetcher: RSS Error {response.status_code} for query '{sq}'")
+        # Merge in query order so earlier (more specific) queries win dedup, as before
+        all_results = []
+        seen_links = set()  # Dedup across queries
+        for sq, items in zip(search_queries, per_query_items):
+            count = 0
+            for claims_obj in items:
+                if count >= per_query_limit: 
+                    break
+                link = claims_obj["claimReview"][0]["url"]
+                # Dedup by link
+                if link in seen_links:
                     continue
-                    
-                # Parse XML
-                root = ET.fromstring(response.content)
-                
-                count = 0
-                for item in root.findall('.//item'):
-                    if count >= per_query_limit: 
-                        break
-                    
-                    title = item.find('title').text if item.find('title') is not None else ""
-                    link = item.find('link').text if item.find('link') is not None else ""
-                    pubDate = item.find('pubDate').text if item.find('pubDate') is not None else ""
-                    source = item.find('source').text if item.find('source') is not None else "Google News"
-                    
-                    # Dedup by link
-                    if link in seen_links:
-                        continue
-                    seen_links.add(link)
-                    
-                    clean_text = title
-                    
-                    claims_obj = {
-                        "text": clean_text,
-                        "claimant": source,
-                        "claimDate": pubDate,
-                        "claimReview": [{"url": link, "title": title}],
-                        "source": source,
-                        "languageCode": "en"
-                    }
-                    all_results.append(claims_obj)
-                    count += 1
-                    
-                print(f"NewsFetcher: Found {count} items for sub-query '{sq}'")
-                        
-            except Exception as e:
-                print(f"NewsFetcher Error for query '{sq}': {e}")
-                import traceback
-                traceback.print_exc()
+                seen_links.add(link)
+                all_results.append(claims_obj)
+                count += 1
+            print(f"NewsFetcher: Found {count} items for sub-query '{sq}'")
         
         print(f"NewsFetcher: Total unique results: {len(all_results)}")
         return all_results
+
+    async def _fetch_query(self, client, sq, parse_cap, deadline):
+        items = []
+        try:
+            with metrics.external("news_rss"):
+                await asyncio.wait_for(self._stream_items(client, sq, parse_cap, items), timeout=deadline)
+        except asyncio.TimeoutError:
+            print(f"NewsFetcher: Deadline ({deadline}s) hit for query '{sq}'; keeping {len(items)} parsed items.")
+        except Exception as e:
+            print(f"NewsFetcher Error for query '{sq}': {e}")
+            import traceback
+            traceback.print_exc()
+        return items
+
+    async def _stream_items(self, client, sq, parse_cap, items):
+        """Parse RSS <item>s into `items` as bytes arrive; stops reading once `parse_cap` is reached."""
+        encoded_query = quote_plus(sq)
+        rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
+        
+        parser = ET.XMLPullParser(events=("end",))
+        async with client.stream("GET", rss_url) as response:
+            if response.status_code != 200:
+                print(f"NewsFetcher: RSS Error {response.status_code} for query '{sq}'")
+                return
+            
+            async for chunk in response.aiter_bytes():
+                parser.feed(chunk)
+                for _, elem in parser.read_events():
+                    if elem.tag != "item":
+                        continue
+                    items.append(self._item_to_claim(elem))
+                    elem.clear()
+                    if len(items) >= parse_cap:
+                        return
+
+    def _item_to_claim(self, item):
+        title = item.find('title').text if item.find('title') is not None else ""
+        link = item.find('link').text if item.find('link') is not None else ""
+        pubDate = item.find('pubDate').text if item.find('pubDate') is not None else ""
+        source = item.find('source').text if item.find('source') is not None else "Google News"
+        
+        clean_text = title
+        
+        return {
+            "text": clean_text,
+            "claimant": source,
+            "claimDate": pubDate,
+            "claimReview": [{"url": link, "title": title}],
+            "source": source,
+            "languageCode": "en"
+        }
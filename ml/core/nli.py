@@ -1,21 +1,48 @@
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 import torch.nn.functional as F
+import os
+from ml.core.cache import TwoTierCache, text_hash
+from ml.core.onnx_backend import backend_of, wrap_sequence_classifier
+
+SAFETY_HYPOTHESIS = "This text describes a situation involving physical danger, health risks, or death."
 
 class StanceClassifier:
-    def __init__(self, model_name="cross-encoder/nli-distilroberta-base"):
+    def __init__(self, model_name="cross-encoder/nli-distilroberta-base", batch_size=None):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"NLI Stance Classifier loaded on {self.device}")
+        self._init_cache(model_name, batch_size)
         
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModelForSequenceClassification.from_pretrained(model_name).to(self.device)
         self.model.eval()
         
         # Read label mapping from model config (ground truth)
-        if hasattr(self.model.config, 'id2label') and self.model.config.id2label:
-            raw_map = self.model.config.id2label
-            self.label_mapping = {int(k): v.lower() for k, v in raw_map.items()}
-            print(f"NLI Label Mapping (from model config): {self.label_mapping}")
+        self._init_labels(getattr(self.model.config, 'id2label', None), source="model config")
+        
+        # Optional ONNX Runtime / int8 backend (INFERENCE_BACKEND); falls back to the PyTorch model
+        self.model = wrap_sequence_classifier(self.model, model_name, self.device)
+        self.backend = backend_of(self.model)
+
+    def _init_cache(self, model_name, batch_size=None):
+        """Batch size and score cache; shared with the inference-server proxy (RemoteStanceClassifier)."""
+        # Max pairs per forward pass for the batched APIs (bounds peak memory on CPU workers)
+        self.batch_size = batch_size or int(os.getenv("NLI_BATCH_SIZE", 16))
+        
+        # Score cache: probabilities per (kind, claim, evidence, model), so hot
+        # claims resubmitted after the result cache expires skip the cross-encoder
+        self.model_name = model_name
+        self.cache = TwoTierCache(
+            namespace="nli:v1",
+            max_entries=int(os.getenv("NLI_CACHE_SIZE", 50000)),
+            ttl=int(os.getenv("NLI_CACHE_TTL", 7 * 86400))
+        )
+
+    def _init_labels(self, id2label, source):
+        """Label index <-> name lookups from an id2label mapping (falls back to the known one)."""
+        if id2label:
+            self.label_mapping = {int(k): v.lower() for k, v in id2label.items()}
+            print(f"NLI Label Mapping (from {source}): {self.label_mapping}")
         else:
             # Verified fallback for cross-encoder/nli-distilroberta-base
             self.label_mapping = {0: "contradiction", 1: "entailment", 2: "neutral"}
@@ -35,26 +62,123 @@ class StanceClassifier:
         Predict stance of evidence toward a claim.
         Premise=Evidence, Hypothesis=Claim → "Given this evidence, is the claim true?"
         """
-        inputs = self.tokenizer(
-            evidence, 
-            claim, 
-            return_tensors="pt", 
-            truncation=True, 
+        probs = self._score_pairs([(evidence, claim)], keys=[self._cache_key("stance", claim, evidence)])[0]
+        return self._stance_from_probs(probs)
+
+    def is_topically_relevant(self, claim, evidence):
+        """
+        Quick semantic check: does the evidence even relate to the same topic as the claim?
+        Uses entailment as a proxy for topical overlap.
+        Returns (is_relevant: bool, relevance_score: float)
+        """
+        # Check: "Given the claim, does the evidence discuss the same topic?"
+        # Higher entailment + lower contradiction = topically aligned
+        probs = self._score_pairs([(claim, evidence)], keys=[self._cache_key("relevance", claim, evidence)])[0]
+        return self._relevance_from_probs(probs)
+
+    def predict_batch(self, claim, evidences, batch_size=None):
+        """
+        Batched `predict`: one stance dict per evidence text, in input order.
+        """
+        pairs = [(ev, claim) for ev in evidences]
+        keys = [self._cache_key("stance", claim, ev) for ev in evidences]
+        return [self._stance_from_probs(p) for p in self._score_pairs(pairs, batch_size, keys)]
+
+    def relevance_batch(self, claim, evidences, batch_size=None):
+        """
+        Batched `is_topically_relevant`: one (is_relevant, relevance_score) per evidence text.
+        """
+        pairs = [(claim, ev) for ev in evidences]
+        keys = [self._cache_key("relevance", claim, ev) for ev in evidences]
+        return [self._relevance_from_probs(p) for p in self._score_pairs(pairs, batch_size, keys)]
+
+    def score_batch(self, claim, evidences, batch_size=None):
+        """
+        Relevance gating and stance for every evidence text in one set of micro-batches.
+        Both pair orderings (claim→evidence for relevance, evidence→claim for stance)
+        are scored together, so similar-length pairs share padded forward passes.
+        Returns (relevance_results, stance_results), each aligned with `evidences`.
+        """
+        n = len(evidences)
+        pairs = [(claim, ev) for ev in evidences] + [(ev, claim) for ev in evidences]
+        keys = [self._cache_key("relevance", claim, ev) for ev in evidences] + \
+               [self._cache_key("stance", claim, ev) for ev in evidences]
+        probs = self._score_pairs(pairs, batch_size, keys)
+        relevance = [self._relevance_from_probs(p) for p in probs[:n]]
+        stances = [self._stance_from_probs(p) for p in probs[n:]]
+        return relevance, stances
+
+    def _cache_key(self, kind, claim, evidence):
+        # Per backend: int8/ONNX probabilities must not be served to torch workers (or vice versa)
+        return f"{self.model_name}:{self.backend}:{kind}:{text_hash(claim)}:{text_hash(evidence)}"
+
+    def _score_pairs(self, pairs, batch_size=None, keys=None):
+        """
+        Run (premise, hypothesis) pairs through the cross-encoder.
+        Pairs are tokenized together, sorted by length and padded per micro-batch
+        so short pairs are not padded out to the longest one (see `_run_pairs`).
+        If `keys` is given, cached probabilities are reused and only misses hit the model.
+        Returns softmax probabilities as plain lists, in input order.
+        """
+        if not pairs:
+            return []
+        
+        results = [None] * len(pairs)
+        pending = list(range(len(pairs)))
+        if keys is not None:
+            cached = self.cache.get_many(keys)
+            pending = [i for i in pending if keys[i] not in cached]
+            for i in range(len(pairs)):
+                if keys[i] in cached:
+                    results[i] = cached[keys[i]]
+        if not pending:
+            return results
+        
+        probs = self._run_pairs([pairs[i] for i in pending], batch_size)
+        for i, row in zip(pending, probs):
+            results[i] = row
+        
+        if keys is not None:
+            self.cache.set_many({keys[i]: results[i] for i in pending})
+        return results
+
+    def _run_pairs(self, pairs, batch_size=None):
+        """
+        Uncached model execution for `_score_pairs`.
+        Also used directly by the inference server to score pairs from many workers at once.
+        """
+        batch_size = batch_size or self.batch_size
+        encoded = self.tokenizer(
+            [premise for premise, _ in pairs],
+            [hypothesis for _, hypothesis in pairs],
+            truncation=True,
             max_length=512
-        ).to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            probs = F.softmax(outputs.logits, dim=-1)
-        
+        )
+        order = sorted(range(len(pairs)), key=lambda i: len(encoded["input_ids"][i]))
+        
+        results = [None] * len(pairs)
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            features = [{k: encoded[k][i] for k in encoded.keys()} for i in chunk]
+            inputs = self.tokenizer.pad(features, return_tensors="pt").to(self.device)
+            
+            with torch.no_grad():
+                outputs = self.model(**inputs)
+                probs = F.softmax(outputs.logits, dim=-1)
+            
+            for i, row in zip(chunk, probs.tolist()):
+                results[i] = row
+        return results
+
+    def _stance_from_probs(self, probs):
         # Use the verified label mapping indices
         idx_contra = self.label_to_idx.get("contradiction", 0)
         idx_entail = self.label_to_idx.get("entailment", 1)
         idx_neutral = self.label_to_idx.get("neutral", 2)
             
-        p_contra = probs[0][idx_contra].item()
-        p_entail = probs[0][idx_entail].item()
-        p_neutral = probs[0][idx_neutral].item()
+        p_contra = probs[idx_contra]
+        p_entail = probs[idx_entail]
+        p_neutral = probs[idx_neutral]
         
         # FIX: Raised contradiction threshold from 0.33 → 0.50
         # 0.33 was too low — unrelated articles about different events (e.g. Iran/Israel 
@@ -77,33 +201,14 @@ class StanceClassifier:
             }
         }
 
-    def is_topically_relevant(self, claim, evidence):
-        """
-        Quick semantic check: does the evidence even relate to the same topic as the claim?
-        Uses entailment as a proxy for topical overlap.
-        Returns (is_relevant: bool, relevance_score: float)
-        """
-        # Check: "Given the claim, does the evidence discuss the same topic?"
-        # Higher entailment + lower contradiction = topically aligned
-        inputs = self.tokenizer(
-            claim, 
-            evidence, 
-            return_tensors="pt", 
-            truncation=True, 
-            max_length=512
-        ).to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            probs = F.softmax(outputs.logits, dim=-1)
-        
+    def _relevance_from_probs(self, probs):
         idx_contra = self.label_to_idx.get("contradiction", 0)
         idx_entail = self.label_to_idx.get("entailment", 1)
         idx_neutral = self.label_to_idx.get("neutral", 2)
         
-        p_contra = probs[0][idx_contra].item()
-        p_entail = probs[0][idx_entail].item()
-        p_neutral = probs[0][idx_neutral].item()
+        p_contra = probs[idx_contra]
+        p_entail = probs[idx_entail]
+        p_neutral = probs[idx_neutral]
         
         # Relevance = entailment + neutral (both indicate topical connection)
         # Contradiction alone isn't enough — it could mean "same topic, opposite claim" (relevant!)
@@ -123,23 +228,13 @@ class StanceClassifier:
         Zero-shot semantic check for safety-critical content.
         Hypothesis: "This text describes a situation involving physical danger, health risks, or death."
         """
-        hypothesis = "This text describes a situation involving physical danger, health risks, or death."
+        hypothesis = SAFETY_HYPOTHESIS
         
         # Order: (Premise, Hypothesis)
-        inputs = self.tokenizer(
-            text, 
-            hypothesis, 
-            return_tensors="pt", 
-            truncation=True, 
-            max_length=512
-        ).to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            probs = F.softmax(outputs.logits, dim=-1)
+        probs = self._score_pairs([(text, hypothesis)], keys=[self._cache_key("safety", text, hypothesis)])[0]
             
         idx_entail = self.label_to_idx.get("entailment", 1)
-        p_entail = probs[0][idx_entail].item()
+        p_entail = probs[idx_entail]
         
         print(f"DEBUG: Safety Check '{text[:30]}...' -> Entailment: {p_entail:.4f}")
         
@@ -0,0 +1,246 @@
+"""
+Optional ONNX Runtime backend for CPU inference.
+
+INFERENCE_BACKEND selects how the no-grad forward passes run:
+  torch      eager PyTorch fp32 (default)
+  onnx       ONNX Runtime, fp32 graph
+  onnx-int8  ONNX Runtime, dynamically quantized int8 weights
+
+Graphs are produced by `python -m ml.training.export_onnx` into ONNX_MODEL_DIR.
+If the backend is unavailable (onnxruntime missing, graph not exported, GPU device)
+the caller keeps its PyTorch model. XAI saliency always runs on PyTorch, since it needs gradients.
+"""
+import os
+import time
+
+import numpy as np
+import torch
+
+BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/onnx")
+
+
+def model_dir(model_name):
+    return os.path.join(ONNX_MODEL_DIR, model_name.replace("/", "__"))
+
+
+def model_path(model_name, quantized):
+    return os.path.join(model_dir(model_name), "model.int8.onnx" if quantized else "model.onnx")
+
+
+def checkpoint_dir(model_name):
+    """
+    Full HF checkpoint saved next to the graphs. Models without a trained classifier head
+    (roberta-base) get a random one on every from_pretrained, so PyTorch, ONNX and XAI
+    must all load this one saved copy to agree with each other.
+    """
+    return os.path.join(model_dir(model_name), "checkpoint")
+
+
+def _session(path):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def _load_session(model_name, device, backend=None):
+    backend = backend or BACKEND
+    if backend == "torch":
+        return None
+    if backend not in ("onnx", "onnx-int8"):
+        print(f"⚠️ Unknown INFERENCE_BACKEND '{backend}'. Using PyTorch.")
+        return None
+    if device != "cpu":
+        print(f"ONNX backend is CPU-only; keeping PyTorch for {model_name} on {device}.")
+        return None
+
+    path = model_path(model_name, quantized=(backend == "onnx-int8"))
+    if not os.path.exists(path):
+        print(f"⚠️ ONNX graph not found at {path}. Run `python -m ml.training.export_onnx`. Using PyTorch.")
+        return None
+    try:
+        session = _session(path)
+    except Exception as e:
+        print(f"⚠️ Could not load ONNX graph {path}: {e}. Using PyTorch.")
+        return None
+    print(f"{model_name}: using ONNX Runtime backend ({backend})")
+    return session
+
+
+class _Output:
+    def __init__(self, logits):
+        self.logits = logits
+
+
+class OnnxSequenceClassifier:
+    """
+    Callable with the same calling convention as a HF sequence-classification model
+    under no_grad: `model(**inputs).logits` returns a torch tensor.
+    """
+
+    def __init__(self, session, backend):
+        self.session = session
+        self.backend = backend
+        self.input_names = [i.name for i in session.get_inputs()]
+
+    def __call__(self, **inputs):
+        feed = {
+            name: inputs[name].detach().cpu().numpy().astype(np.int64)
+            for name in self.input_names if name in inputs
+        }
+        logits = self.session.run(["logits"], feed)[0]
+        return _Output(torch.from_numpy(logits))
+
+    def eval(self):
+        return self
+
+
+class OnnxSentenceEncoder:
+    """
+    Drop-in for SentenceTransformer.encode for mean-pooled models such as all-MiniLM-L6-v2.
+    The graph outputs the token embeddings; pooling and normalization run in numpy.
+    """
+
+    def __init__(self, session, tokenizer, backend, normalize=True, max_length=256):
+        self.session = session
+        self.backend = backend
+        self.tokenizer = tokenizer
+        self.normalize = normalize
+        self.max_length = max_length
+        self.input_names = [i.name for i in session.get_inputs()]
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+            token_embeddings = self.session.run(["last_hidden_state"], feed)[0]
+
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.append(pooled.astype(np.float32))
+
+        result = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return result[0] if single else result
+
+
+def backend_of(model):
+    """
+    Backend a (possibly wrapped) model actually runs on: "torch", "onnx" or "onnx-int8".
+    Cached scores and stored embeddings are keyed by it, since ONNX/int8 outputs only
+    approximate the PyTorch ones.
+    """
+    return getattr(model, "backend", "torch")
+
+
+def wrap_sequence_classifier(model, model_name, device, backend=None):
+    """Return an ONNX-backed stand-in for `model` if the configured backend allows it, else `model`."""
+    backend = backend or BACKEND
+    session = _load_session(model_name, device, backend)
+    return OnnxSequenceClassifier(session, backend) if session is not None else model
+
+
+def wrap_sentence_encoder(st_model, model_name, device, backend=None):
+    backend = backend or BACKEND
+    session = _load_session(model_name, device, backend)
+    if session is None:
+        return st_model
+    normalize = any(type(m).__name__ == "Normalize" for m in st_model)
+    return OnnxSentenceEncoder(session, st_model.tokenizer, backend, normalize=normalize,
+                               max_length=st_model.max_seq_length)
+
+
+class _KeywordModule(torch.nn.Module):
+    """torch.onnx.export passes inputs positionally; HF models are safest called by keyword."""
+
+    def __init__(self, inner, input_names, output_name):
+        super().__init__()
+        self.inner = inner
+        self.input_names = input_names
+        self.output_name = output_name
+
+    def forward(self, *args):
+        outputs = self.inner(**dict(zip(self.input_names, args)))
+        return getattr(outputs, self.output_name)
+
+
+def save_checkpoint(model, tokenizer, model_name):
+    path = checkpoint_dir(model_name)
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    print(f"✅ Saved {path}")
+
+
+def export_sequence_classifier(model, tokenizer, model_name, pair=False):
+    """Export a HF sequence classifier to ONNX (fp32) and write a dynamically quantized int8 copy."""
+    os.makedirs(model_dir(model_name), exist_ok=True)
+    sample = ("The earth is round.", "The earth is flat.") if pair else ("The earth is round.",)
+    inputs = tokenizer(*sample, return_tensors="pt")
+    input_names = list(inputs.keys())
+
+    module = _KeywordModule(model, input_names, "logits")
+    _export(module, inputs, input_names, ["logits"], model_path(model_name, quantized=False))
+    _quantize(model_name)
+
+
+def export_sentence_encoder(st_model, model_name):
+    """Export the transformer body of a SentenceTransformer (pooling stays in numpy)."""
+    os.makedirs(model_dir(model_name), exist_ok=True)
+    inputs = st_model.tokenizer(["The earth is round."], return_tensors="pt")
+    input_names = list(inputs.keys())
+
+    module = _KeywordModule(st_model[0].auto_model, input_names, "last_hidden_state")
+    _export(module, inputs, input_names, ["last_hidden_state"], model_path(model_name, quantized=False))
+    _quantize(model_name)
+
+
+def _export(module, inputs, input_names, output_names, path):
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    for name in output_names:
+        dynamic_axes[name] = {0: "batch"} if name == "logits" else {0: "batch", 1: "sequence"}
+
+    module.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            tuple(inputs[name] for name in input_names),
+            path,
+            input_names=input_names,
+            output_names=output_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    print(f"✅ Exported {path}")
+
+
+def _quantize(model_name):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(
+        model_path(model_name, quantized=False),
+        model_path(model_name, quantized=True),
+        weight_type=QuantType.QInt8
+    )
+    print(f"✅ Quantized {model_path(model_name, quantized=True)}")
+
+
+def time_call(fn, repeats=3):
+    """Best-of-N wall time in seconds (first call doubles as warm-up)."""
+    fn()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -1,54 +1,99 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
 import os
+import numpy as np
+from ml.core import resources
+from ml import metrics
 
 class EvidenceRetriever:
-    def __init__(self, collection_name="claims"):
+    def __init__(self, collection_name="claims", embedding_model=None):
         # Connect to Chroma
         host = os.getenv("CHROMA_HOST", "127.0.0.1") # Default to local info, docker-compose uses 'chromadb'
         port = int(os.getenv("CHROMA_PORT", 8000)) # Default 8000
         
+        if embedding_model is not None:
+            # Shared encoder (e.g. the inference server proxy)
+            resources.register_embedding_model(embedding_model)
+        
+        # Load embedding model (all-MiniLM-L6-v2 for speed and good performance).
+        # The registry's encoder is cached: the same claim is embedded several times per
+        # task (initial, post-fetch and deep-fetch retrieval) and again on every resubmission
+        self.embedding_model = resources.get_embedding_model()
+        
         try:
-            print(f"Connecting to ChromaDB at {host}:{port}...")
-            self.client = chromadb.HttpClient(host=host, port=port)
-            self.collection = self.client.get_or_create_collection(name=collection_name)
+            # Shared with ingestion via the resource registry; one collection per embedding backend
+            self.client = resources.get_chroma_client(host, port)
+            self.collection = resources.get_collection(
+                host, port, resources.collection_name(collection_name, self.embedding_model)
+            )
         except Exception as e:
             print(f"FAILED to connect to ChromaDB: {e}")
             self.client = None
             self.collection = None
-        
-        # Load embedding model
-        # using all-MiniLM-L6-v2 for speed and good performance
-        self.device = "cuda" if os.getenv("CUDA_VISIBLE_DEVICES") != "" else "cpu" 
-        # Better check:
-        import torch
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"RAG Retriever loaded on {self.device}")
-        
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2', device=self.device)
+        print(f"RAG Retriever ready ({resources.EMBEDDING_MODEL})")
 
-    def retrieve(self, query, n_results=50):
+    def retrieve(self, query, n_results=50, fresh=None):
+        """
+        Nearest evidence for `query` from ChromaDB.
+        `fresh` are documents just returned by save_claims (with their embeddings); they are
+        scored locally with the collection's distance metric and merged in, so live-fetched
+        evidence is visible without waiting for the vector store to index it.
+        """
         # Embed query
         query_embedding = self.embedding_model.encode(query).tolist()
         
+        evidence = []
         if not self.collection:
             print("ChromaDB collection not available.")
-            return []
-
-        # Query Chroma
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
-        )
+        else:
+            # Query Chroma
+            with metrics.external("chroma"):
+                results = self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=n_results
+                )
+            
+            if results['documents']:
+                for i, doc in enumerate(results['documents'][0]):
+                    meta = results['metadatas'][0][i] if results['metadatas'] else {}
+                    evidence.append({
+                        "text": doc,
+                        "url": meta.get("source_url"),
+                        "score": results['distances'][0][i] if results['distances'] else 0
+                    })
         
-        evidence = []
-        if results['documents']:
-            for i, doc in enumerate(results['documents'][0]):
-                meta = results['metadatas'][0][i] if results['metadatas'] else {}
-                evidence.append({
-                    "text": doc,
-                    "url": meta.get("source_url"),
-                    "score": results['distances'][0][i] if results['distances'] else 0
-                })
+        if fresh:
+            evidence = self._merge_fresh(query_embedding, evidence, fresh, n_results)
         
         return evidence
+
+    def _distance_space(self):
+        metadata = getattr(self.collection, "metadata", None) or {}
+        return metadata.get("hnsw:space", "l2")
+
+    def _merge_fresh(self, query_embedding, evidence, fresh, n_results):
+        q = np.asarray(query_embedding, dtype=np.float32)
+        docs = np.asarray([d["embedding"] for d in fresh], dtype=np.float32)
+        
+        # Exact distances in the same space Chroma reports, so thresholds stay comparable
+        space = self._distance_space()
+        if space == "cosine":
+            sims = docs @ q / (np.linalg.norm(docs, axis=1) * np.linalg.norm(q) + 1e-12)
+            distances = 1.0 - sims
+        elif space == "ip":
+            distances = 1.0 - docs @ q
+        else:
+            # Chroma's default "l2" is squared euclidean
+            distances = ((docs - q) ** 2).sum(axis=1)
+        
+        seen_texts = {e["text"] for e in evidence}
+        for doc, distance in zip(fresh, distances):
+            if doc["text"] in seen_texts:
+                continue
+            seen_texts.add(doc["text"])
+            evidence.append({
+                "text": doc["text"],
+                "url": doc.get("url"),
+                "score": float(distance)
+            })
+        
+        evidence.sort(key=lambda e: e["score"])
+        return evidence[:n_results]
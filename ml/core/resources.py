@@ -0,0 +1,96 @@
+"""
+Process-wide registry for expensive shared resources.
+
+The worker's EvidenceRetriever and ingestion (save_claims, which runs inside the
+worker on every smart/deep fetch) both go through here, so the embedding model and
+the Chroma client are loaded once per process instead of once per call.
+"""
+import os
+import threading
+
+from ml.core.embeddings import CachedEncoder
+
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+
+# Re-entrant: a factory may itself fetch another resource (collection -> client)
+_lock = threading.RLock()
+_instances = {}
+_stats = {"loads": 0, "loads_avoided": 0}
+
+
+def get_or_create(key, factory):
+    """Return the instance registered under `key`, creating it with `factory()` on first use."""
+    with _lock:
+        if key in _instances:
+            _stats["loads_avoided"] += 1
+            return _instances[key]
+        # Failures are not cached: the next caller retries the load
+        instance = factory()
+        _instances[key] = instance
+        _stats["loads"] += 1
+        return instance
+
+
+def register(key, instance):
+    """Install a pre-built instance (e.g. an inference-server proxy) under `key`."""
+    with _lock:
+        _instances[key] = instance
+
+
+def stats():
+    with _lock:
+        return dict(_stats, resources=sorted(str(k) for k in _instances))
+
+
+def get_embedding_model():
+    """Cached MiniLM encoder shared by retrieval and ingestion."""
+    def load():
+        from sentence_transformers import SentenceTransformer
+        from ml.core.onnx_backend import wrap_sentence_encoder
+        import torch
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        print(f"Loading embedding model {EMBEDDING_MODEL} on {device}...")
+        model = SentenceTransformer(EMBEDDING_MODEL, device=device)
+        # Optional ONNX Runtime / int8 backend (INFERENCE_BACKEND)
+        model = wrap_sentence_encoder(model, EMBEDDING_MODEL, device)
+        return CachedEncoder(model, EMBEDDING_MODEL)
+
+    return get_or_create(("embedding_model", EMBEDDING_MODEL), load)
+
+
+def register_embedding_model(encoder):
+    register(("embedding_model", EMBEDDING_MODEL), CachedEncoder(encoder, EMBEDDING_MODEL))
+
+
+def get_chroma_client(host, port):
+    def load():
+        import chromadb
+        print(f"Connecting to ChromaDB at {host}:{port}...")
+        return chromadb.HttpClient(host=host, port=port)
+
+    return get_or_create(("chroma_client", host, port), load)
+
+
+def collection_name(name, encoder=None):
+    """
+    Chroma collection holding vectors from `encoder` (default: the shared embedding model).
+    ONNX/int8 vectors only approximate the PyTorch ones, so they get their own collection
+    (e.g. "claims-onnx-int8", filled by ingestion) instead of mixing into the torch index.
+    """
+    backend = getattr(encoder or get_embedding_model(), "backend", "torch")
+    return name if backend == "torch" else f"{name}-{backend}"
+
+
+def get_collection(host, port, name="claims", metadata=None):
+    def load():
+        client = get_chroma_client(host, port)
+        try:
+            return client.get_or_create_collection(name=name, metadata=metadata)
+        except Exception as e:
+            print(f"WARN: Could not get/create collection: {e}. Trying simple create_collection...")
+            # Fallback for some chroma versions
+            return client.create_collection(name)
+
+    return get_or_create(("chroma_collection", host, port, name), load)
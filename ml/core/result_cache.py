@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+from ml.core import resources
+
+RESULT_TTL = int(os.getenv("RESULT_CACHE_TTL", 3600))
+# Cosine similarity above which a past claim's verdict is reused (> 1 disables the semantic level)
+SIMILARITY_THRESHOLD = float(os.getenv("RESULT_CACHE_SIMILARITY", 0.97))
+
+
+def normalize_claim(text):
+    """Case-, whitespace- and punctuation-insensitive form used for exact cache hits."""
+    text = re.sub(r"[^\w\s]", " ", (text or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def claim_hash(text):
+    return hashlib.sha256(normalize_claim(text).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-level cache of finished analyses.
+
+    Level 1: exact match on the normalized claim text (Redis, RESULT_CACHE_TTL).
+    Level 2: nearest past claim by embedding; its result is reused when cosine
+    similarity >= RESULT_CACHE_SIMILARITY. Past claims are indexed in a dedicated
+    Chroma collection ("result_cache", cosine space); the result itself still lives in Redis.
+    Every hit records what it matched in result["meta"]["cache"] for auditing.
+    """
+
+    def __init__(self, redis_client, encoder, collection_name="result_cache"):
+        self.redis = redis_client
+        self.encoder = encoder
+        self.collection = None
+        if SIMILARITY_THRESHOLD <= 1.0:
+            host = os.getenv("CHROMA_HOST", "127.0.0.1")
+            port = int(os.getenv("CHROMA_PORT", 8000))
+            try:
+                self.collection = resources.get_collection(
+                    host, port, resources.collection_name(collection_name, encoder),
+                    metadata={"hnsw:space": "cosine"}
+                )
+            except Exception as e:
+                print(f"ResultCache: semantic level disabled ({e})")
+
+    def key(self, text):
+        return f"cache:v2:{claim_hash(text)}"
+
+    def get(self, text):
+        """Cached result for `text` (with meta.cache filled in), or None."""
+        key = self.key(text)
+        cached = self.redis.get(key)
+        if cached:
+            result = json.loads(cached)
+            self._annotate(result, text, level="exact", key=key)
+            return result
+
+        if self.collection is None:
+            return None
+        try:
+            embedding = self.encoder.encode(text).tolist()
+            match = self.collection.query(query_embeddings=[embedding], n_results=1)
+        except Exception as e:
+            print(f"ResultCache: semantic lookup failed: {e}")
+            return None
+        if not match["ids"] or not match["ids"][0]:
+            return None
+
+        # Chroma cosine distance = 1 - cosine similarity
+        similarity = 1.0 - match["distances"][0][0]
+        if similarity < SIMILARITY_THRESHOLD:
+            return None
+        matched_key = match["metadatas"][0][0].get("cache_key")
+        cached = self.redis.get(matched_key) if matched_key else None
+        if not cached:
+            # The matched claim's result expired; treat as a miss
+            return None
+
+        result = json.loads(cached)
+        self._annotate(
+            result, text, level="semantic", key=matched_key,
+            matched_claim=match["documents"][0][0], similarity=similarity
+        )
+        return result
+
+    def set(self, text, result):
+        key = self.key(text)
+        self.redis.setex(key, RESULT_TTL, json.dumps(result))
+
+        if self.collection is None:
+            return
+        try:
+            self.collection.upsert(
+                ids=[key],
+                documents=[text],
+                embeddings=[self.encoder.encode(text).tolist()],
+                metadatas=[{"cache_key": key, "cached_at": int(time.time())}]
+            )
+        except Exception as e:
+            print(f"ResultCache: could not index claim for semantic lookup: {e}")
+
+    def _annotate(self, result, text, level, key, matched_claim=None, similarity=None):
+        matched_claim = matched_claim if matched_claim is not None else result.get("text")
+        print(f"ResultCache: {level} hit for '{text[:60]}' -> '{(matched_claim or '')[:60]}'")
+        result.setdefault("meta", {})["cache"] = {
+            "level": level,
+            "key": key,
+            "matched_claim": matched_claim,
+            "similarity": similarity,
+            "threshold": SIMILARITY_THRESHOLD if level == "semantic" else None,
+        }
+        result["text"] = text
@@ -1,39 +1,36 @@
-import re
+from ml.core.lexicon import get_lexicon
 
 class EvidenceRouter:
     def __init__(self):
-        # Heuristics for "Disputable Claims" (Lane A)
-        self.claim_patterns = [
-            r"\bcure\b", r"\bprevent\b", r"\bsecret\b", r"\bhoax\b", 
-            r"\bfake\b", r"\bconspiracy\b", r"\breal\b", r"\btruth about\b",
-            r"\bviral\b", r"\bvideo shows\b", r"\bdied\b", r"\balive\b",
-            r"\bdangerous\b", r"\bunsafe\b", r"\bkill\b", r"\bpoison\b", r"\brisk\b"
-        ]
+        # Heuristics for "Disputable Claims" (Lane A): lexicons/route_claim.txt
+        # Heuristics for "General Events" (Lane B): lexicons/route_event.txt
+        self.lexicon = get_lexicon()
+
+    def _scores(self, text):
+        # Whole-word matches, one scan for both lanes
+        found = self.lexicon.terms(text, whole_word=True)
+        claim_score = len(found.get("route_claim", ()))
+        event_score = len(found.get("route_event", ()))
         
-        # Heuristics for "General Events" (Lane B)
-        self.event_patterns = [
-            r"\battacked\b", r"\binvaded\b", r"\bwar\b", r"\belection\b",
-            r"\bwon\b", r"\blost\b", r"\bhappened\b", r"\bearthquake\b",
-            r"\bhurricane\b", r"\bprotest\b", r"\bsummit\b", r"\bmeeting\b"
-        ]
+        print(f"Router: ClaimScore={claim_score}, EventScore={event_score}")
+        return claim_score, event_score
 
-    def route(self, text):
+    def priorities(self, text):
         """
-        Returns 'lane_a' (Claim), 'lane_b' (Event), or 'hybrid'.
+        Returns every lane, highest priority first, e.g. ['lane_a', 'lane_b'].
+        Used by speculative fetching, which starts all lanes at once.
         """
-        text_lower = text.lower()
-        
-        # Check Claim Signals
-        claim_score = sum(1 for p in self.claim_patterns if re.search(p, text_lower))
-        
-        # Check Event Signals
-        event_score = sum(1 for p in self.event_patterns if re.search(p, text_lower))
-        
-        print(f"Router: ClaimScore={claim_score}, EventScore={event_score}")
+        claim_score, event_score = self._scores(text)
         
         if claim_score > 0:
-            return "lane_a"  # Prioritize specific rumors
+            return ["lane_a", "lane_b"]  # Prioritize specific rumors
         elif event_score > 0:
-            return "lane_b"
+            return ["lane_b", "lane_a"]
         else:
-            return "lane_a" # Default to Fact Check for safety, falling back later
+            return ["lane_a", "lane_b"] # Default to Fact Check for safety, falling back later
+
+    def route(self, text):
+        """
+        Returns 'lane_a' (Claim) or 'lane_b' (Event) — the top entry of `priorities`.
+        """
+        return self.priorities(text)[0]
@@ -1,45 +1,107 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import os
+import threading
+
 import torch
 import torch.nn.functional as F
+from ml.core.lexicon import get_lexicon
+
+# heuristic: risk comes from the lexicon/caps/punctuation heuristics alone and RoBERTa is
+#            only loaded (on first use) when XAI or a model-based score asks for it
+# model:     every analyze() also runs the RoBERTa forward pass (reported as model_probs)
+STYLOMETRY_TIERS = ("heuristic", "model")
+STYLOMETRY_TIER = os.getenv("STYLOMETRY_TIER", "heuristic").lower()
 
 class StylometricAnalyzer:
-    def __init__(self, model_name="roberta-base"):
+    def __init__(self, model_name="roberta-base", tier=None):
+        self.model_name = model_name
+        self.tier = (tier or STYLOMETRY_TIER).lower()
+        if self.tier not in STYLOMETRY_TIERS:
+            raise ValueError(f"Unknown stylometry tier '{self.tier}' (choose from {', '.join(STYLOMETRY_TIERS)})")
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Stylometry loaded on {self.device}")
-        
-        # In a real scenario, this would be a fine-tuned model for misinformation
-        # For Phase 2 prototype, we use base RoBERTa and simulate a risk score or use zero-shot
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_name).to(self.device)
-        self.model.eval()
+        self._load_lock = threading.Lock()
+        self._loaded = None
+        # False while the classifier head is a fresh random init (no saved checkpoint yet)
+        self.head_trained = None
+        print(f"Stylometry ready ({self.tier} tier, {model_name} loads on first use, {self.device})")
+
+    def _load(self):
+        """Load the transformer once; concurrent first callers wait for the same load."""
+        if self._loaded is None:
+            with self._load_lock:
+                if self._loaded is None:
+                    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+                    from ml.core.onnx_backend import checkpoint_dir, wrap_sequence_classifier
+
+                    # In a real scenario, this would be a fine-tuned model for misinformation
+                    # For Phase 2 prototype, we use base RoBERTa and simulate a risk score or use zero-shot.
+                    # roberta-base has no classification head, so prefer the copy export_onnx saved
+                    # (the one its graphs were exported from)
+                    checkpoint = checkpoint_dir(self.model_name)
+                    source = checkpoint if os.path.isdir(checkpoint) else self.model_name
+                    print(f"Stylometry: Loading {source} on {self.device}...")
+                    tokenizer = AutoTokenizer.from_pretrained(source)
+                    # Seeded so a missing head at least comes out the same in every process
+                    with torch.random.fork_rng(devices=[]):
+                        torch.manual_seed(0)
+                        model, info = AutoModelForSequenceClassification.from_pretrained(
+                            source, output_loading_info=True
+                        )
+                    model = model.to(self.device)
+                    model.eval()
+                    self.head_trained = not any(k.startswith("classifier") for k in info["missing_keys"])
+
+                    # No-grad scoring may run on ONNX Runtime (INFERENCE_BACKEND); XAI keeps using
+                    # self.model because saliency needs gradients. A graph only matches the head it
+                    # was exported with, so without the saved checkpoint stay on PyTorch
+                    if self.head_trained:
+                        inference_model = wrap_sequence_classifier(model, self.model_name, self.device)
+                    else:
+                        print(f"⚠️ Stylometry: {source} has no trained classifier head; keeping PyTorch. "
+                              f"Run `python -m ml.training.export_onnx` to save one.")
+                        inference_model = model
+                    self._loaded = (tokenizer, model, inference_model)
+        return self._loaded
 
+    @property
+    def model_loaded(self):
+        return self._loaded is not None
 
+    @property
+    def tokenizer(self):
+        return self._load()[0]
 
-    def detect_signals(self, text):
+    @property
+    def model(self):
+        return self._load()[1]
+
+    @property
+    def inference_model(self):
+        return self._load()[2]
+
+    def detect_signals(self, text, found=None):
+        """`found`: lexicon terms per category (get_lexicon().terms(text)), if already scanned."""
         signals = []
-        text_lower = text.lower()
+        if found is None:
+            found = get_lexicon().terms(text)
         
-        # 1. Causal Absolutes
-        causal_kw = ["cause", "causes", "cure", "cures", "leads to", "results in", "inevitable", "undeniable", "must be", "proven", "kills", "destroys"]
-        if any(w in text_lower for w in causal_kw):
+        # 1. Causal Absolutes (lexicons/causal.txt)
+        if found.get("causal"):
             signals.append({
                 "name": "Causal Absolutes",
                 "trigger": "Absolute causal verbs",
                 "explanation": "Uses absolute causal language that oversimplifies complex relationships."
             })
 
-        # 2. Emotional Loading
-        emotional_kw = ["shocking", "terrifying", "unbelievable", "devastating", "exposed", "horror", "deadly", "poison", "bleach", "dangerous", "toxic"]
-        if any(w in text_lower for w in emotional_kw):
+        # 2. Emotional Loading (lexicons/emotional.txt)
+        if found.get("emotional"):
              signals.append({
                 "name": "Emotional Loading",
                 "trigger": "Emotionally charged terms",
                 "explanation": "Emotionally loaded terms increase persuasive impact without adding evidence."
             })
 
-        # 3. Attribution Gap
-        attribution_kw = ["according to", "reported by", "stated by", "sources say", "experts say", "study shows"]
-        has_attribution = any(w in text_lower for w in attribution_kw)
+        # 3. Attribution Gap (lexicons/attribution.txt)
+        has_attribution = bool(found.get("attribution"))
         if not has_attribution and len(text.split()) > 10: # Only flag if text is decent length
              signals.append({
                 "name": "Attribution Gap",
@@ -47,9 +109,8 @@ class StylometricAnalyzer:
                 "explanation": "Lacks attribution to verifiable sources or reporting entities."
             })
             
-        # 4. Conspiracy Framing
-        consp_kw = ["they don't want you to know", "hidden", "suppressed", "secret agenda", "truth about", "wake up", "mainstream media"]
-        if any(w in text_lower for w in consp_kw):
+        # 4. Conspiracy Framing (lexicons/conspiracy.txt)
+        if found.get("conspiracy"):
              signals.append({
                 "name": "Conspiracy Framing",
                 "trigger": "Suppression narratives",
@@ -80,11 +141,28 @@ class StylometricAnalyzer:
         # Fallback
         return f"This claim contains indicators of {names[0].lower()} which may influence interpretation independent of the facts."
 
-    def analyze(self, text):
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=512).to(self.device)
+    def tokenize(self, text):
+        return self.tokenizer(text, return_tensors="pt", truncation=True, max_length=512).to(self.device)
+
+    def analyze(self, text, use_model=None):
+        """
+        Risk score, signals and verdict. `use_model` (default: the tier) also runs the
+        RoBERTa forward pass; without it the model is neither loaded nor run.
+        """
+        if not (self.tier == "model" if use_model is None else use_model):
+            return self.score(text)
+        inputs = self.tokenize(text)
         with torch.no_grad():
-            outputs = self.model(**inputs)
-            probs = F.softmax(outputs.logits, dim=-1)
+            outputs = self.inference_model(**inputs)
+        return self.score(text, outputs.logits)
+
+    def score(self, text, logits=None):
+        """
+        Risk score, signals and verdict for `text`.
+        `logits` are the model outputs for the same text, if a forward pass was already run
+        (e.g. by XAIExplainer.analyze_with_heatmap) — they are never recomputed here.
+        """
+        probs = F.softmax(logits.detach(), dim=-1) if logits is not None else None
             
         # Mock logic for "risk" until we fine-tune:
         # Use entropy or just a placeholder logic based on some keywords for demo
@@ -94,19 +172,9 @@ class StylometricAnalyzer:
         # Enhanced Heuristic Logic for Prototype
         risk_score = 0.1
         
-        # 1. Keyword Detection
-        red_flags = [
-            "shocking", "you won't believe", "secret", "exposed", "truth", "wake up", 
-            "sheeple", "poisoning", "control", "mind", "5g", "bio-resonance", 
-            "mitochondrial", "vibration", "frequency", "quantum", "hidden", "censored",
-            "bioweapon", "agenda", "reset", "flat earth", "ice wall"
-        ]
-        
-        found_flags = 0
-        text_lower = text.lower()
-        for flag in red_flags:
-            if flag in text_lower:
-                found_flags += 1
+        # 1. Keyword Detection (lexicons/red_flags.txt); one scan serves the signals below too
+        found = get_lexicon().terms(text)
+        found_flags = len(found.get("red_flags", ()))
         
         # Add 0.15 per flag, max 0.6 from flags
         risk_score += min(found_flags * 0.15, 0.6)
@@ -126,7 +194,7 @@ class StylometricAnalyzer:
             risk_score += 0.2
             
         # NEW: Linguistic Signals & Verdict
-        signals = self.detect_signals(text)
+        signals = self.detect_signals(text, found)
         
         # Boost risk score based on signals
         for signal in signals:
@@ -145,5 +213,8 @@ class StylometricAnalyzer:
         return {
             "score": final_risk,
             "signals": signals,
-            "verdict": verdict
+            "verdict": verdict,
+            "model_probs": probs[0].tolist() if probs is not None else None,
+            # Which tier produced this result: "model" whenever a forward pass was run
+            "tier": "model" if probs is not None else "heuristic"
         }
@@ -1,67 +1,90 @@
+import math
+import os
+import time
+
 import torch
 
+SALIENCY_METHODS = ("gradient", "attention", "occlusion")
+# Occluded copies of the input scored per forward pass
+OCCLUSION_BATCH_SIZE = int(os.getenv("XAI_OCCLUSION_BATCH_SIZE", 32))
+
 class XAIExplainer:
     def __init__(self, stylometric_analyzer):
         self.analyzer = stylometric_analyzer
         self.device = self.analyzer.device
-        self.model = self.analyzer.model
+        self._frozen = False
         print(f"XAI Explainer initialized (Custom Implementation)")
 
-    def explain(self, text):
-        # Lightweight gradient-based saliency (Input x Gradient)
-        # This avoids 'captum' dependency issues on Windows/CPU
-        
-        inputs = self.analyzer.tokenizer(
-            text, 
-            return_tensors="pt", 
-            truncation=True, 
-            max_length=512
-        ).to(self.device)
-        
+    @property
+    def model(self):
+        # Loaded by the analyzer on first use, so a heuristic-tier worker that never
+        # explains anything never loads RoBERTa
+        model = self.analyzer.model
+        if not self._frozen:
+            # Inference only: gradients are taken w.r.t. the embedding output, never the weights,
+            # so the backward pass skips every parameter-gradient computation
+            for param in model.parameters():
+                param.requires_grad_(False)
+            self._frozen = True
+        return model
+
+    def _embeddings_module(self):
+        if hasattr(self.model, "roberta"):
+            return self.model.roberta.embeddings
+        elif hasattr(self.model, "bert"):
+            return self.model.bert.embeddings
+        return None
+
+    def _forward_with_saliency(self, inputs):
+        """
+        One forward pass with gradients enabled only on the embedding output.
+        `inputs` may hold a padded batch; samples are independent, so the gradient of the
+        summed target logits gives each row its own saliency.
+        Returns (logits, heatmaps) with one heatmap per row ([] if the architecture
+        has no known embedding layer).
+        """
+        embedding_layer = self._embeddings_module()
+        if embedding_layer is None:
+            # Fallback: cannot explain, but still produce logits
+            with torch.no_grad():
+                logits = self.model(**inputs).logits
+            return logits, [[] for _ in range(logits.shape[0])]
+
         # Enable gradients for embeddings
-        # We need to find the embedding layer hook
         embeddings = None
         def hook_fn(module, input, output):
             nonlocal embeddings
+            output.requires_grad_(True)
             embeddings = output
-            embeddings.retain_grad()
 
-        # Hook into embeddings
-        if hasattr(self.model, "roberta"):
-            handle = self.model.roberta.embeddings.register_forward_hook(hook_fn)
-        elif hasattr(self.model, "bert"):
-            handle = self.model.bert.embeddings.register_forward_hook(hook_fn)
-        else:
-             # Fallback: cannot explain
-            return []
-
-        # Forward pass
-        self.model.zero_grad()
-        outputs = self.model(**inputs)
-        logits = outputs.logits
-        
-        # Target class 1 (Risk/Fake)
-        score = logits[0, 1]
-        score.backward()
-        
-        # Input x Gradient
-        grads = embeddings.grad
-        # Sum across embedding dim
-        # shape: [1, seq_len, hidden] -> [1, seq_len]
-        # We use L2 norm or just sum * input?
-        # Simpler: just norm of grads
-        attr = grads.norm(dim=-1).squeeze(0)
-        
-        # Normalize
-        attr = (attr - attr.min()) / (attr.max() - attr.min() + 1e-9)
-        
-        # Cleanup
-        handle.remove()
-        
+        handle = embedding_layer.register_forward_hook(hook_fn)
+        try:
+            with torch.enable_grad():
+                logits = self.model(**inputs).logits
+                # Target class 1 (Risk/Fake)
+                score = logits[:, 1].sum()
+                grads, = torch.autograd.grad(score, embeddings)
+        finally:
+            # Cleanup
+            handle.remove()
+
+        heatmaps = []
+        mask = inputs["attention_mask"].bool()
+        for row in range(grads.shape[0]):
+            # Simpler: just norm of grads, over real (non-padding) tokens only
+            # shape: [seq_len, hidden] -> [seq_len]
+            attr = grads[row][mask[row]].norm(dim=-1)
+
+            # Normalize
+            attr = (attr - attr.min()) / (attr.max() - attr.min() + 1e-9)
+            heatmaps.append(self._token_map(inputs["input_ids"][row][mask[row]], attr))
+
+        return logits.detach(), heatmaps
+
+    def _token_map(self, input_ids, attr):
         # Map tokens
-        input_ids = inputs["input_ids"][0]
         tokens = self.analyzer.tokenizer.convert_ids_to_tokens(input_ids)
-        
+
         sentiment_map = []
         for token, score in zip(tokens, attr):
             if token in ["<s>", "</s>", "<pad>", "[CLS]", "[SEP]", "[PAD]"]:
@@ -70,5 +93,113 @@ class XAIExplainer:
                 "token": token.replace("Ġ", ""),
                 "score": score.item()
             })
-            
+
         return sentiment_map
+
+    @staticmethod
+    def _normalize(attr):
+        return (attr - attr.min()) / (attr.max() - attr.min() + 1e-9)
+
+    def _attention_saliency(self, inputs):
+        """Last-layer attention from the <s> summary token, averaged over heads. One no-grad pass."""
+        with torch.no_grad():
+            outputs = self.model(**inputs, output_attentions=True)
+        if not outputs.attentions:
+            raise RuntimeError("Model did not return attention weights")
+        mask = inputs["attention_mask"][0].bool()
+        attr = outputs.attentions[-1][0].mean(dim=0)[0][mask]
+        return self._token_map(inputs["input_ids"][0][mask], self._normalize(attr)), 1
+
+    def _occlusion_saliency(self, inputs):
+        """
+        Drop in risk probability when each token is masked out. All occluded copies are
+        scored under no-grad in batches of OCCLUSION_BATCH_SIZE.
+        Returns (heatmap, forward_passes).
+        """
+        tokenizer = self.analyzer.tokenizer
+        ids = inputs["input_ids"][0][inputs["attention_mask"][0].bool()]
+        replacement = tokenizer.mask_token_id if tokenizer.mask_token_id is not None else tokenizer.pad_token_id
+        special = set(tokenizer.all_special_ids)
+        positions = [i for i in range(ids.shape[0]) if ids[i].item() not in special]
+
+        variants = ids.unsqueeze(0).repeat(len(positions) + 1, 1)
+        for row, pos in enumerate(positions, 1):
+            variants[row, pos] = replacement
+
+        risk = []
+        with torch.no_grad():
+            # Row 0 is the unmodified input
+            for start in range(0, variants.shape[0], OCCLUSION_BATCH_SIZE):
+                chunk = variants[start:start + OCCLUSION_BATCH_SIZE]
+                logits = self.model(input_ids=chunk, attention_mask=torch.ones_like(chunk)).logits
+                risk.append(torch.softmax(logits, dim=-1)[:, 1])
+        risk = torch.cat(risk)
+
+        attr = torch.zeros(ids.shape[0], device=risk.device)
+        # Only tokens whose removal lowers the risk count as evidence for it
+        attr[positions] = (risk[0] - risk[1:]).clamp(min=0)
+        passes = math.ceil(variants.shape[0] / OCCLUSION_BATCH_SIZE)
+        return self._token_map(ids, self._normalize(attr)), passes
+
+    def explain(self, text, method="gradient"):
+        return self.explain_with_cost(text, method)[0]
+
+    def explain_with_cost(self, text, method="gradient"):
+        """
+        Token saliency for `text` with the chosen method, plus what it cost:
+          gradient  - gradient norm on the embeddings (one forward + one backward pass)
+          attention - last-layer attention (one no-grad forward pass, cheapest)
+          occlusion - per-token masking (no-grad, ceil((tokens + 1) / batch) forward passes)
+        Returns (heatmap, cost).
+        """
+        if method not in SALIENCY_METHODS:
+            raise ValueError(f"Unknown saliency method '{method}' (choose from {', '.join(SALIENCY_METHODS)})")
+        start = time.perf_counter()
+        inputs = self.analyzer.tokenize(text)
+        if method == "gradient":
+            # Lightweight gradient-based saliency (gradient norm on embeddings)
+            # This avoids 'captum' dependency issues on Windows/CPU
+            _, heatmaps = self._forward_with_saliency(inputs)
+            heatmap, forward_passes, backward_passes = heatmaps[0], 1, 1
+        elif method == "attention":
+            (heatmap, forward_passes), backward_passes = self._attention_saliency(inputs), 0
+        else:
+            (heatmap, forward_passes), backward_passes = self._occlusion_saliency(inputs), 0
+        cost = {
+            "method": method,
+            "ms": round((time.perf_counter() - start) * 1000, 2),
+            "forward_passes": forward_passes,
+            "backward_passes": backward_passes,
+            "no_grad": backward_passes == 0,
+            "tokens": len(heatmap),
+        }
+        return heatmap, cost
+
+    def analyze_with_heatmap(self, text):
+        """
+        Stylometric analysis and saliency heatmap from a single tokenization and forward pass.
+        Returns (style_analysis, heatmap) — the same values as
+        `analyzer.analyze(text)` and `explain(text)` called separately.
+        """
+        inputs = self.analyzer.tokenize(text)
+        logits, heatmaps = self._forward_with_saliency(inputs)
+        return self.analyzer.score(text, logits), heatmaps[0]
+
+    def analyze_with_heatmap_batch(self, texts, batch_size=8):
+        """
+        Batched `analyze_with_heatmap`: texts are sorted by token length and run in
+        padded micro-batches. Returns a list of (style_analysis, heatmap) in input order.
+        """
+        tokenizer = self.analyzer.tokenizer
+        encoded = tokenizer(texts, truncation=True, max_length=512)
+        order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+
+        results = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            features = [{k: encoded[k][i] for k in encoded.keys()} for i in chunk]
+            inputs = tokenizer.pad(features, return_tensors="pt").to(self.device)
+            logits, heatmaps = self._forward_with_saliency(inputs)
+            for row, i in enumerate(chunk):
+                results[i] = (self.analyzer.score(texts[i], logits[row:row + 1]), heatmaps[row])
+        return results
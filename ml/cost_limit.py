@@ -0,0 +1,78 @@
+"""
+Cost-unit rate limiting for analysis submissions (and uncached heatmaps).
+
+HTTP-call limits (slowapi) treat a 500-claim batch like a single claim. Every client
+instead gets ANALYZE_COST_BUDGET units per ANALYZE_COST_WINDOW seconds, and each claim
+submitted costs ANALYZE_COST_PER_CLAIM units, whichever endpoint it arrives through.
+"""
+import os
+
+COST_BUDGET = int(os.getenv("ANALYZE_COST_BUDGET", 300))
+COST_WINDOW = int(os.getenv("ANALYZE_COST_WINDOW", 3600))
+COST_PER_CLAIM = int(os.getenv("ANALYZE_COST_PER_CLAIM", 1))
+# Uncached heatmaps; occlusion runs one forward pass per ~32 tokens, so it costs more
+COST_PER_HEATMAP = {
+    "gradient": int(os.getenv("HEATMAP_COST_GRADIENT", 1)),
+    "attention": int(os.getenv("HEATMAP_COST_ATTENTION", 1)),
+    "occlusion": int(os.getenv("HEATMAP_COST_OCCLUSION", 2)),
+}
+
+# Charge all-or-nothing: a batch that doesn't fit is rejected without using units
+_CHARGE_SCRIPT = """
+local used = tonumber(redis.call('get', KEYS[1]) or '0')
+local cost = tonumber(ARGV[1])
+if used + cost > tonumber(ARGV[2]) then
+    return {0, used}
+end
+used = redis.call('incrby', KEYS[1], cost)
+if redis.call('ttl', KEYS[1]) < 0 then
+    redis.call('expire', KEYS[1], ARGV[3])
+end
+return {1, used}
+"""
+
+# Give units back (never below zero); a window that already expired is left alone
+_REFUND_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+local used = redis.call('decrby', KEYS[1], ARGV[1])
+if used < 0 then
+    redis.call('incrby', KEYS[1], -used)
+    used = 0
+end
+return used
+"""
+
+
+class CostLimitExceeded(Exception):
+    def __init__(self, cost, remaining, retry_after):
+        self.cost = cost
+        self.remaining = remaining
+        self.retry_after = retry_after
+        super().__init__(f"Request costs {cost} units, {remaining} left in this window")
+
+
+def claim_cost(n_claims):
+    return n_claims * COST_PER_CLAIM
+
+
+def heatmap_cost(method):
+    return COST_PER_HEATMAP.get(method, COST_PER_CLAIM)
+
+
+def charge(r, client, cost):
+    """Deduct `cost` units from `client`'s window; raises CostLimitExceeded if it doesn't fit."""
+    key = f"cost:{client}"
+    allowed, used = r.eval(_CHARGE_SCRIPT, 1, key, cost, COST_BUDGET, COST_WINDOW)
+    if not allowed:
+        ttl = r.ttl(key)
+        raise CostLimitExceeded(cost, max(COST_BUDGET - int(used), 0), ttl if ttl > 0 else COST_WINDOW)
+    return COST_BUDGET - int(used)
+
+
+def refund(r, client, cost):
+    """Return `cost` units to `client`'s window, e.g. for claims that were charged but never enqueued."""
+    if cost <= 0:
+        return
+    r.eval(_REFUND_SCRIPT, 1, f"cost:{client}", cost)
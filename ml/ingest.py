@@ -1,9 +1,13 @@
 import asyncio
 import os
-import requests
+import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text as sql_text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from ml.database import AsyncSessionLocal, engine, Base
-from ml.models import Claim
+from ml.models import Claim, SCHEMA_PATCHES
+from ml.core.cache import text_hash
+from ml import metrics
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -12,10 +16,23 @@ load_dotenv()
 GOOGLE_FACT_CHECK_API_KEY = os.getenv("GOOGLE_FACT_CHECK_API_KEY")
 API_URL = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
 
-async def fetch_claims(query="misinformation", max_age_days=30):
+FETCH_BUDGET_SECONDS = float(os.getenv("FACTCHECK_BUDGET_SECONDS", 5))
+MAX_PAGES = int(os.getenv("FACTCHECK_MAX_PAGES", 5))
+
+async def stream_claims(query="misinformation", max_age_days=30, budget=None, max_pages=None):
+    """
+    Non-blocking Fact Check API search that follows `nextPageToken`.
+    Yields one list of claims per page as soon as it arrives. `budget` (seconds)
+    covers the whole stream: when it runs out we stop and keep the pages already yielded.
+    """
     if not GOOGLE_FACT_CHECK_API_KEY:
         print("❌ GOOGLE_FACT_CHECK_API_KEY not set.")
-        return []
+        return
+
+    budget = FETCH_BUDGET_SECONDS if budget is None else budget
+    max_pages = max_pages or MAX_PAGES
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
 
     params = {
         "key": GOOGLE_FACT_CHECK_API_KEY,
@@ -24,23 +41,61 @@ async def fetch_claims(query="misinformation", max_age_days=30):
         "maxAgeDays": max_age_days
     }
     
-    try:
-        # User requested timer: if 50 not found in time, use what we got (or fail gracefully)
-        response = requests.get(API_URL, params=params, timeout=5) # 5 second timeout
-        
-        if response.status_code != 200:
-            print(f"❌ Error fetching claims: {response.text}")
-            return []
+    async with httpx.AsyncClient() as client:
+        for page in range(max_pages):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                print(f"⚠️ Google API budget ({budget}s) used after {page} page(s). Using whatever data we have.")
+                return
+            try:
+                # User requested timer: if 50 not found in time, use what we got (or fail gracefully)
+                with metrics.external("factcheck_api"):
+                    response = await asyncio.wait_for(client.get(API_URL, params=params), timeout=remaining)
+            except asyncio.TimeoutError:
+                print(f"⚠️ Google API Timed out ({budget}s budget). Using whatever data we have.")
+                return
+            except Exception as e:
+                print(f"❌ API Request Failed: {e}")
+                return
+
+            if response.status_code != 200:
+                print(f"❌ Error fetching claims: {response.text}")
+                return
             
-        data = response.json()
-        return data.get("claims", [])
-        
-    except requests.exceptions.Timeout:
-        print("⚠️ Google API Timed out (5s). Using whatever data we have.")
-        return []
-    except Exception as e:
-        print(f"❌ API Request Failed: {e}")
-        return []
+            data = response.json()
+            claims = data.get("claims", [])
+            if claims:
+                yield claims
+            
+            next_token = data.get("nextPageToken")
+            if not next_token:
+                return
+            params["pageToken"] = next_token
+
+async def fetch_claims(query="misinformation", max_age_days=30):
+    """All pages from `stream_claims` within the budget, as one list."""
+    all_claims = []
+    async for page in stream_claims(query=query, max_age_days=max_age_days):
+        all_claims.extend(page)
+    return all_claims
+
+async def ingest_stream(pages):
+    """
+    Save pages from `stream_claims` as they arrive: page N is embedded and written
+    while page N+1 is still downloading.
+    Returns (claims, fresh) — every claim received, and save_claims' fresh documents.
+    """
+    claims = []
+    fresh = []
+    pending = None
+    async for page in pages:
+        claims.extend(page)
+        if pending is not None:
+            fresh.extend(await pending)
+        pending = asyncio.create_task(save_claims(page))
+    if pending is not None:
+        fresh.extend(await pending)
+    return claims, fresh
 
 def get_demo_claims():
     """Fallback claims for demo mode if no API key is present."""
@@ -99,77 +154,163 @@ def get_demo_claims():
         }
     ]
 
+def claim_id(content_hash):
+    """Stable Chroma ID: identical in every worker process, unlike the salted built-in hash()."""
+    return f"claim_{content_hash}"
+
 async def save_claims(claims):
-    # 1. Save to Postgres
-    async with AsyncSessionLocal() as session:
-        count = 0
-        accepted_claims = []
-        for item in claims:
-            text = item.get("text")
-            claim_review = item.get("claimReview", [])
-            url = claim_review[0].get("url") if claim_review else None
-            
-            if text:
-                new_claim = Claim(
-                    content=text,
-                    source_url=url,
-                    status="pending"
-                )
-                session.add(new_claim)
-                count += 1
-                accepted_claims.append({"text": text, "url": url, "source": item.get("source", "Google FactCheck")})
+    """
+    Persist claims to Postgres and ChromaDB, idempotently.
+    Claims are keyed by the content hash of their normalized text: Postgres gets one bulk
+    INSERT ... ON CONFLICT DO NOTHING, and Chroma is only written for documents that are
+    new or whose text/metadata changed.
+    Returns the freshly embedded documents ({"id", "text", "url", "source", "embedding"})
+    so callers can rank them immediately instead of waiting for the vector store to index them.
+    """
+    fresh = []
+    
+    accepted_claims = []
+    seen_hashes = set()
+    for item in claims:
+        text = item.get("text")
+        claim_review = item.get("claimReview", [])
+        url = claim_review[0].get("url") if claim_review else None
         
-        await session.commit()
-        print(f"✅ Saved {count} claims to Postgres.")
+        if text:
+            content_hash = text_hash(text)
+            if content_hash in seen_hashes:
+                continue
+            seen_hashes.add(content_hash)
+            accepted_claims.append({
+                "hash": content_hash,
+                "text": text,
+                "url": url,
+                "source": item.get("source", "Google FactCheck")
+            })
+    
+    if not accepted_claims:
+        return fresh
+    
+    # 1. Save to Postgres (one statement; existing hashes are skipped by the unique index)
+    async with AsyncSessionLocal() as session:
+        stmt = pg_insert(Claim).values([
+            {"content": c["text"], "source_url": c["url"], "content_hash": c["hash"], "status": "pending"}
+            for c in accepted_claims
+        ]).on_conflict_do_nothing(index_elements=["content_hash"]).returning(Claim.id)
+        with metrics.external("postgres"):
+            result = await session.execute(stmt)
+            inserted = len(result.fetchall())
+            await session.commit()
+        print(f"✅ Saved {inserted} new claims to Postgres ({len(accepted_claims) - inserted} already present).")
 
     # 2. Sync to ChromaDB
     try:
-        import chromadb
-        from sentence_transformers import SentenceTransformer
+        from ml.core import resources
         
         host = os.getenv("CHROMA_HOST", "chromadb")
         port = int(os.getenv("CHROMA_PORT", 8000))
         
-        print(f"Connecting to ChromaDB at {host}:{port}...")
-        client = chromadb.HttpClient(host=host, port=port)
+        # Reuse the process-wide client, collection and embedding model
+        # (inside the worker these are the ones EvidenceRetriever already loaded)
+        model = resources.get_embedding_model()
+        collection = resources.get_collection(host, port, resources.collection_name("claims", model))
+        print(f"Ingestion resources: {resources.stats()}")
         
-        # FIX: Ensure collection exists before upserting
-        try:
-             # Try to get existing one
-            collection = client.get_or_create_collection("claims")
-            print(f"DEBUG: Collection 'claims' retrieved/created. Count: {collection.count()}")
-        except Exception as e:
-            print(f"WARN: Could not get/create collection: {e}. Trying simple create_collection...")
-            # Fallback for some chroma versions
-            collection = client.create_collection("claims")
-
-        print("Loading embedding model for ingestion...")
-        model = SentenceTransformer('all-MiniLM-L6-v2')
+        for c in accepted_claims:
+            c["id"] = claim_id(c["hash"])
+            c["metadata"] = {"source_url": c["url"], "source": c["source"]}
         
-        if accepted_claims:
-            documents = [c["text"] for c in accepted_claims]
-            embeddings = model.encode(documents).tolist()
-            metadatas = [{"source_url": c["url"], "source": c["source"]} for c in accepted_claims]
-            ids = [f"claim_{hash(c['text'])}" for c in accepted_claims]
-            
-            collection.upsert(
-                ids=ids,
-                documents=documents,
-                embeddings=embeddings,
-                metadatas=metadatas
+        # Skip documents Chroma already holds unchanged
+        with metrics.external("chroma"):
+            existing = await asyncio.to_thread(
+                collection.get, ids=[c["id"] for c in accepted_claims], include=["documents", "metadatas"]
             )
-            print(f"✅ Synced {len(accepted_claims)} claims to ChromaDB.")
+        stored = {
+            i: (doc, meta)
+            for i, doc, meta in zip(existing["ids"], existing["documents"] or [], existing["metadatas"] or [])
+        }
+        changed = [c for c in accepted_claims if stored.get(c["id"]) != (c["text"], c["metadata"])]
+        
+        if changed:
+            documents = [c["text"] for c in changed]
+            # Encoding and the Chroma write are blocking; keep them off the event loop
+            # so concurrent downloads (see ingest_stream) keep making progress
+            vectors = await asyncio.to_thread(
+                model.encode, documents, batch_size=resources.EMBEDDING_BATCH_SIZE
+            )
+            embeddings = vectors.tolist()
+            ids = [c["id"] for c in changed]
+            
+            fresh = [
+                {"id": c["id"], "text": c["text"], "url": c["url"], "source": c["source"], "embedding": e}
+                for c, e in zip(changed, embeddings)
+            ]
+            
+            with metrics.external("chroma"):
+                await asyncio.to_thread(
+                    collection.upsert,
+                    ids=ids,
+                    documents=documents,
+                    embeddings=embeddings,
+                    metadatas=[c["metadata"] for c in changed]
+                )
+        print(f"✅ Synced {len(changed)} claims to ChromaDB ({len(accepted_claims) - len(changed)} unchanged).")
             
     except Exception as e:
         import traceback
         print(f"❌ Failed to sync to ChromaDB: {e}")
         traceback.print_exc()
+    
+    return fresh
+
+async def wait_for_indexing(fresh, max_wait=None, poll_interval=0.5, probe_size=5):
+    """
+    Fallback for vector stores that index asynchronously: wait (up to INDEX_WAIT_SECONDS)
+    only while the query path can't find freshly upserted documents yet. `fresh` are the
+    documents save_claims returned (with their embeddings). Returns True once they are found.
+
+    A get() by id sees rows as soon as upsert returns, so it can't tell whether the ANN
+    index caught up; querying with a fresh document's own vector can. The most recently
+    written documents are probed (they are indexed last), in one batched query.
+    """
+    if max_wait is None:
+        max_wait = float(os.getenv("INDEX_WAIT_SECONDS", 5))
+    probe = [d for d in fresh or [] if d.get("embedding") is not None][-probe_size:]
+    if not probe or max_wait <= 0:
+        return True
+    
+    from ml.core import resources
+    host = os.getenv("CHROMA_HOST", "chromadb")
+    port = int(os.getenv("CHROMA_PORT", 8000))
+    
+    waited = 0.0
+    while True:
+        try:
+            # A few neighbours, not 1: a near-duplicate already in the store may rank first
+            found = await asyncio.to_thread(
+                resources.get_collection(host, port, resources.collection_name("claims")).query,
+                query_embeddings=[d["embedding"] for d in probe], n_results=3, include=["distances"]
+            )
+            pending = sum(1 for d, ids in zip(probe, found["ids"]) if d["id"] not in ids)
+        except Exception as e:
+            print(f"WARN: Could not check indexing status: {e}")
+            return False
+        if pending == 0:
+            return True
+        if waited >= max_wait:
+            print(f"WARN: {pending}/{len(probe)} probed documents still not queryable after {max_wait}s.")
+            return False
+        print(f"Waiting for indexing ({pending}/{len(probe)} probed documents not queryable yet)...")
+        await asyncio.sleep(poll_interval)
+        waited += poll_interval
 
 async def main():
     print("Starting ingestion...")
     # Ensure tables exist
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        for patch in SCHEMA_PATCHES:
+            await conn.execute(sql_text(patch))
 
     topics = ["misinformation", "ukraine war", "gaza", "climate change", "vaccines", "economy"]
     
@@ -177,20 +318,15 @@ async def main():
     if not GOOGLE_FACT_CHECK_API_KEY:
          print("⚠️ No API Key. Using Demo Data.")
          all_claims = get_demo_claims()
+         await save_claims(all_claims)
     else:
         for topic in topics:
             print(f"Fetching claims for topic: {topic}...")
-            claims = await fetch_claims(query=topic)
-            if claims:
-                all_claims.extend(claims)
-            
-    if not all_claims and not GOOGLE_FACT_CHECK_API_KEY:
-        # Fallback only if absolutely nothing found
-        all_claims = get_demo_claims()
+            # Pages are saved as they stream in
+            claims, _ = await ingest_stream(stream_claims(query=topic))
+            all_claims.extend(claims)
         
-    if all_claims:
-        await save_claims(all_claims)
-    else:
+    if not all_claims:
         print("❌ Still no claims found after fallback.")
 
 if __name__ == "__main__":
@@ -3,8 +3,18 @@ from ml.database import engine, Base
 from ml.models import Claim, AnalysisResult
 import chromadb
 import os
-from pydantic import BaseModel
-from ml.workers.tasks import analyze_text_task
+from pydantic import BaseModel, Field
+from ml.workers.tasks import analyze_text_task, heatmap_task
+from ml.workers.celery_app import queue_depths, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from ml.workers.result_sink import load_result
+from ml.workers import coalesce, progress, heatmaps
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from ml import metrics
+from ml.cost_limit import CostLimitExceeded, charge, claim_cost, heatmap_cost, refund
+import asyncio
+import json
+import time
+import uuid
 from celery.result import AsyncResult
 
 # Rate Limiting
@@ -21,8 +31,38 @@ app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # Streaming endpoints are timed to their first byte
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.HTTP_SECONDS.labels(request.method, route, response.status_code).observe(time.perf_counter() - start)
+    return response
+
+@app.get("/metrics")
+@limiter.exempt
+async def prometheus_metrics(request: Request):
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.exception_handler(CostLimitExceeded)
+async def cost_limit_exceeded_handler(request: Request, exc: CostLimitExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(exc), "cost": exc.cost, "remaining": exc.remaining},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# Longer texts are truncated to 512 tokens by the models anyway
+MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", 5000))
+
 class AnalyzeRequest(BaseModel):
-    text: str
+    text: str = Field(..., max_length=MAX_TEXT_CHARS)
+
+class HeatmapRequest(BaseModel):
+    text: str = Field(..., max_length=MAX_TEXT_CHARS)
+    method: str = "gradient"
 
 @app.on_event("startup")
 async def startup():
@@ -58,8 +98,12 @@ async def startup():
 
     # 3. Database Creation & Auto-Ingestion
     try:
+        from sqlalchemy import text
+        from ml.models import SCHEMA_PATCHES
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            for patch in SCHEMA_PATCHES:
+                await conn.execute(text(patch))
         print("✅ Database schema synced.")
         
         # Check if DB is empty
@@ -92,21 +136,307 @@ async def health_check():
         "dependencies": ["postgres", "redis", "chromadb"]
     }
 
+_redis = None
+# Streams left open longer than this are closed; the client falls back to polling
+STREAM_TIMEOUT = int(os.getenv("STREAM_TIMEOUT_SECONDS", 600))
+
+def get_redis():
+    import redis
+    global _redis
+    if _redis is None:
+        _redis = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return _redis
+
+def submit_analysis(r, text, priority):
+    """Enqueue one claim; returns (job_id, coalesced)."""
+    # Single-flight: identical claims already in flight share one job
+    job_id = str(uuid.uuid4())
+    inflight_job = coalesce.acquire(r, text, job_id)
+    if inflight_job is not None:
+        return inflight_job, True
+    
+    # Enqueue task
+    try:
+        analyze_text_task.apply_async(args=[text], task_id=job_id, priority=priority)
+    except Exception:
+        coalesce.release(r, text, job_id)
+        raise
+    return job_id, False
+
+# Analysis endpoints are limited in cost units (ml/cost_limit.py) only, not per HTTP call,
+# so many small batches cost the same as one large one
 @app.post("/api/analyze")
-@limiter.limit("5/minute")
+@limiter.exempt
 async def analyze_claim(request: Request, payload: AnalyzeRequest):
-    # Enqueue task
-    task = analyze_text_task.delay(payload.text)
-    return {"job_id": task.id, "status": "submitted"}
+    r = get_redis()
+    client = get_remote_address(request)
+    charge(r, client, claim_cost(1))
+    try:
+        job_id, coalesced = submit_analysis(r, payload.text, PRIORITY_INTERACTIVE)
+    except Exception:
+        refund(r, client, claim_cost(1))
+        raise
+    if coalesced:
+        return {"job_id": job_id, "status": "submitted", "coalesced": True}
+    return {"job_id": job_id, "status": "submitted"}
+
+# --- Batch analysis ---
+BATCH_MAX_CLAIMS = int(os.getenv("BATCH_MAX_CLAIMS", 500))
+BATCH_TTL = int(os.getenv("BATCH_TTL", 86400))
+BATCH_STREAM_TIMEOUT = int(os.getenv("BATCH_STREAM_TIMEOUT_SECONDS", 1800))
+
+def parse_batch_items(items):
+    """Claims as {"id", "text"}; items may be plain strings or {"text", "id"?} objects."""
+    claims = []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"text": item}
+        if not isinstance(item, dict) or not str(item.get("text") or "").strip():
+            raise HTTPException(status_code=422, detail=f"Item {i} has no text")
+        if len(str(item["text"])) > MAX_TEXT_CHARS:
+            raise HTTPException(status_code=422, detail=f"Item {i} is longer than {MAX_TEXT_CHARS} characters")
+        claims.append({"id": item.get("id", i), "text": item["text"]})
+    return claims
+
+async def read_batch(request):
+    """Accepts a JSON list (or {"claims": [...]}), a JSONL body, or a JSONL file upload."""
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None:
+                raise HTTPException(status_code=422, detail="Expected a 'file' field with JSONL")
+            lines = (await upload.read()).decode("utf-8").splitlines()
+            items = [json.loads(line) for line in lines if line.strip()]
+        elif content_type.startswith("application/json"):
+            body = await request.json()
+            items = body.get("claims", []) if isinstance(body, dict) else body
+        else:
+            lines = (await request.body()).decode("utf-8").splitlines()
+            items = [json.loads(line) for line in lines if line.strip()]
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=422, detail=f"Could not parse batch: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="Expected a list of claims")
+    return parse_batch_items(items)
+
+@app.post("/api/analyze/batch")
+@limiter.exempt
+async def analyze_batch(request: Request):
+    """
+    Fan a list of claims out through the regular pipeline (same caches, same coalescing).
+    Results stream from GET /api/analyze/batch/{batch_id}/results as they finish.
+    """
+    claims = await read_batch(request)
+    if not claims:
+        raise HTTPException(status_code=422, detail="Batch is empty")
+    if len(claims) > BATCH_MAX_CLAIMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_CLAIMS} claims per batch")
+    
+    r = get_redis()
+    client = get_remote_address(request)
+    charge(r, client, claim_cost(len(claims)))
+    
+    def submit_all():
+        """Submits in order; stops at the first failure (broker down) and returns the claims left."""
+        for i, claim in enumerate(claims):
+            try:
+                claim["job_id"], claim["coalesced"] = submit_analysis(r, claim["text"], PRIORITY_BATCH)
+            except Exception as e:
+                print(f"API: Batch submission stopped at claim {i}: {e}")
+                return claims[i:]
+        return []
+    # Hundreds of broker round trips: keep them off the event loop
+    unsubmitted = await asyncio.to_thread(submit_all)
+    # Only claims that were actually enqueued are paid for
+    refund(r, client, claim_cost(len(unsubmitted)))
+    submitted = claims[:len(claims) - len(unsubmitted)]
+    if not submitted:
+        raise HTTPException(status_code=503, detail="Could not enqueue the batch; no units were charged")
+    
+    batch_id = str(uuid.uuid4())
+    jobs = [{"id": c["id"], "job_id": c["job_id"]} for c in submitted]
+    r.setex(f"batch:{batch_id}", BATCH_TTL, json.dumps(jobs))
+    response = {
+        "batch_id": batch_id,
+        "status": "submitted",
+        "jobs": jobs,
+        "coalesced": sum(1 for c in submitted if c["coalesced"]),
+        "results": f"/api/analyze/batch/{batch_id}/results"
+    }
+    if unsubmitted:
+        # Partially enqueued: the client resubmits these (they were refunded)
+        response["status"] = "partial"
+        response["not_submitted"] = [c["id"] for c in unsubmitted]
+    return response
+
+@app.get("/api/analyze/batch/{batch_id}/results")
+async def stream_batch_results(batch_id: str):
+    """JSONL, one line per claim in completion order: {"id", "job_id", "status", "result"|"error"}."""
+    raw = get_redis().get(f"batch:{batch_id}")
+    if raw is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch")
+    return StreamingResponse(batch_lines(json.loads(raw)), media_type="application/x-ndjson")
+
+def batch_line(job, status, payload):
+    line = {"id": job["id"], "job_id": job["job_id"], "status": status}
+    line.update(payload)
+    return json.dumps(line, default=str) + "\n"
+
+async def batch_lines(jobs):
+    import redis.asyncio as aioredis
+    
+    pending = {}
+    for job in jobs:
+        pending.setdefault(job["job_id"], []).append(job)
+    
+    r = aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    pubsub = r.pubsub()
+    try:
+        # Subscribe first, then sweep jobs that already finished, so none slips through
+        await pubsub.subscribe(*[progress.channel(job_id) for job_id in pending])
+        for job_id in list(pending):
+            status = await job_status(job_id)
+            if status["status"] in ("completed", "failed"):
+                payload = {"result": status["result"]} if status["status"] == "completed" else {"error": status["error"]}
+                for job in pending.pop(job_id):
+                    yield batch_line(job, status["status"], payload)
+        
+        deadline = time.monotonic() + BATCH_STREAM_TIMEOUT
+        while pending and time.monotonic() < deadline:
+            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=progress.HEARTBEAT_SECONDS)
+            if msg is None:
+                continue
+            event = json.loads(json.loads(msg["data"])["event"])
+            if event["stage"] not in progress.TERMINAL_STAGES:
+                continue
+            job_id = msg["channel"].decode().split(":", 1)[1]
+            status = "completed" if event["stage"] == "final" else "failed"
+            for job in pending.pop(job_id, []):
+                yield batch_line(job, status, event["data"])
+        
+        # Still running when the stream gave up: the client can re-request the results URL
+        for jobs_left in pending.values():
+            for job in jobs_left:
+                yield batch_line(job, "processing", {})
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+        await r.aclose()
+
+# --- On-demand XAI heatmaps ---
+HEATMAP_TIMEOUT = int(os.getenv("HEATMAP_TIMEOUT_SECONDS", 30))
+HEATMAP_POLL_SECONDS = 0.2
+
+@app.post("/api/heatmap")
+@limiter.exempt
+async def get_heatmap(request: Request, payload: HeatmapRequest):
+    """Cached heatmaps are free; computing one costs heatmap_cost(method) units."""
+    if payload.method not in heatmaps.METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of: {', '.join(heatmaps.METHODS)}")
+    r = get_redis()
+    entry = heatmaps.get(r, payload.text, payload.method)
+    cached = entry is not None
+    if not cached:
+        client = get_remote_address(request)
+        cost = heatmap_cost(payload.method)
+        charge(r, client, cost)
+        try:
+            job = heatmap_task.apply_async(args=[payload.text, payload.method], priority=PRIORITY_INTERACTIVE)
+        except Exception:
+            refund(r, client, cost)
+            raise
+        # Poll instead of a blocking job.get(), so no executor thread is held for the whole wait
+        deadline = time.monotonic() + HEATMAP_TIMEOUT
+        while not await asyncio.to_thread(job.ready):
+            if time.monotonic() > deadline:
+                raise HTTPException(status_code=504, detail="Heatmap is taking too long, try again shortly")
+            await asyncio.sleep(HEATMAP_POLL_SECONDS)
+        if job.failed():
+            raise HTTPException(status_code=500, detail=f"Heatmap failed: {job.result}")
+        entry = job.result
+    return dict(entry, cached=cached, method_costs=heatmaps.method_costs(r))
+
+@app.get("/api/stats")
+async def get_stats():
+    r = get_redis()
+    # Waiting messages per queue: a queue that keeps growing needs a bigger worker pool
+    return {"coalescing": coalesce.stats(r), "queues": queue_depths(r)}
 
 @app.get("/api/status/{job_id}")
 async def get_status(job_id: str):
+    return await job_status(job_id)
+
+async def job_status(job_id):
     task_result = AsyncResult(job_id)
-    if task_result.state == 'PENDING':
+    # The state read is a blocking result-backend round trip (batch sweeps make hundreds);
+    # a finished task's meta is cached on the AsyncResult, so .result below doesn't repeat it
+    state = await asyncio.to_thread(lambda: task_result.state)
+    if state == 'PENDING':
+        # Celery reports unknown (incl. expired) ids as PENDING: check the persisted results
+        with metrics.external("postgres"):
+            stored = await load_result(job_id)
+        if stored is not None:
+            return {"status": "completed", "result": stored}
         return {"status": "processing"}
-    elif task_result.state == 'SUCCESS':
+    elif state == 'SUCCESS':
         return {"status": "completed", "result": task_result.result}
-    elif task_result.state == 'FAILURE':
+    elif state == 'FAILURE':
         return {"status": "failed", "error": str(task_result.result)}
     else:
-        return {"status": task_result.state}
+        return {"status": state}
+
+@app.get("/api/stream/{job_id}")
+async def stream_status(job_id: str, request: Request):
+    """
+    Server-Sent Events feed of a job's stage events (stylometry, heatmap, retrieval,
+    fetch_started, one stance event per evidence item, then final or failed).
+    Reconnecting clients send Last-Event-ID and only get the events they missed.
+    """
+    try:
+        after = int(request.headers.get("last-event-id", 0))
+    except ValueError:
+        after = 0
+    return StreamingResponse(
+        sse_events(job_id, after),
+        media_type="text/event-stream",
+        # Keep proxies (nginx, the Next.js rewrite) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def sse(event, data, event_id=None):
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return lines + f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def terminal_sse(status):
+    """final/failed event for a finished job_status(), else None."""
+    if status["status"] == "completed":
+        return sse("final", {"result": status["result"]})
+    if status["status"] == "failed":
+        return sse("failed", {"error": status["error"]})
+    return None
+
+async def sse_events(job_id, after=0):
+    # Always check first, reconnects included: a job that finished while the client was
+    # away (possibly long enough ago that its event log expired) is answered from the result
+    done = terminal_sse(await job_status(job_id))
+    if done:
+        yield done
+        return
+    
+    deadline = time.monotonic() + STREAM_TIMEOUT
+    async for seq, event in progress.listen(job_id, after):
+        if seq is None:
+            # Heartbeat comment; also the point where a stalled stream gives up
+            if time.monotonic() > deadline:
+                # Never a bare close: EventSource would just reconnect. Either the job
+                # finished unnoticed, or the client is told to poll /api/status instead
+                status = await job_status(job_id)
+                yield terminal_sse(status) or sse("timeout", {"status": status["status"], "poll": f"/api/status/{job_id}"})
+                return
+            yield ": keep-alive\n\n"
+            continue
+        yield sse(event["stage"], event["data"], seq)
+        if event["stage"] in progress.TERMINAL_STAGES:
+            return
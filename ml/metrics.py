@@ -0,0 +1,113 @@
+"""
+Timing spans and Prometheus metrics shared by the API and the worker.
+
+A span costs two perf_counter() calls and one histogram observation, so it stays on
+in production. Spans are also collected per request into result["meta"]["timings"].
+
+Celery's prefork children each hold their own metrics; with PROMETHEUS_MULTIPROC_DIR set
+(an empty, writable directory) they are aggregated by the exporter in the worker's
+main process (WORKER_METRICS_PORT) and by /metrics on the API.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+# Model stages run from ~10ms to tens of seconds (live fetching)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "prism_stage_seconds", "Time spent in each analysis pipeline stage", ["stage"], buckets=BUCKETS
+)
+EXTERNAL_SECONDS = Histogram(
+    "prism_external_call_seconds", "Latency of calls to external services", ["target", "outcome"], buckets=BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    "prism_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+CACHE_HIT_RATIO = Gauge(
+    "prism_cache_hit_ratio", "Hit ratio of a process's cache since it started", ["cache"],
+    multiprocess_mode="liveall"
+)
+HTTP_SECONDS = Histogram(
+    "prism_http_request_seconds", "API request latency", ["method", "route", "status"], buckets=BUCKETS
+)
+
+
+class Timings:
+    """Named spans for one request; repeated spans (e.g. two NLI passes) accumulate."""
+
+    def __init__(self, spans=None):
+        self.spans = dict(spans or {})
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.spans[name] = self.spans.get(name, 0.0) + elapsed
+            STAGE_SECONDS.labels(name).observe(elapsed)
+
+    def merge(self, other):
+        for name, seconds in (other or {}).items():
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+        return self
+
+    def as_ms(self):
+        return {name: round(seconds * 1000, 2) for name, seconds in self.spans.items()}
+
+
+@contextmanager
+def external(target):
+    """Time one call to an external service (Chroma, Fact Check API, RSS, Postgres)."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_SECONDS.labels(target, outcome).observe(time.perf_counter() - start)
+
+
+# Last stats() snapshot per cache, so cumulative in-process counters become counter increments
+_cache_snapshots = {}
+
+
+def record_cache_stats(cache, stats):
+    """Export a TwoTierCache.stats() snapshot (hits_local, hits_redis, misses, hit_ratio)."""
+    previous = _cache_snapshots.get(cache, {})
+    for field, result in (("hits_local", "hit_local"), ("hits_redis", "hit_redis"), ("misses", "miss")):
+        delta = stats.get(field, 0) - previous.get(field, 0)
+        if delta > 0:
+            CACHE_LOOKUPS.labels(cache, result).inc(delta)
+    CACHE_HIT_RATIO.labels(cache).set(stats.get("hit_ratio", 0.0))
+    _cache_snapshots[cache] = dict(stats)
+
+
+def registry():
+    """Registry to export: aggregated over processes in multiprocess mode, else the default."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        reg = CollectorRegistry()
+        multiprocess.MultiProcessCollector(reg)
+        return reg
+    from prometheus_client import REGISTRY
+    return REGISTRY
+
+
+def render():
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
+
+
+def start_exporter(port):
+    from prometheus_client import start_http_server
+    start_http_server(port, registry=registry())
+
+
+def mark_process_dead(pid):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
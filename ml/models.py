@@ -7,6 +7,8 @@ class Claim(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
+    # sha256 of the whitespace-normalized content; one row per distinct claim text
+    content_hash = Column(String(64), unique=True, index=True, nullable=True)
     source_url = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     status = Column(String, default="pending") # pending, processing, completed, failed
@@ -15,6 +17,8 @@ class AnalysisResult(Base):
     __tablename__ = "analysis_results"
 
     id = Column(Integer, primary_key=True, index=True)
+    # Celery job id; /api/status falls back to this table once Redis has expired the result
+    job_id = Column(String, unique=True, index=True, nullable=True)
     claim_id = Column(Integer, ForeignKey("claims.id"))
     style_risk_score = Column(Float, nullable=True)
     stance_distribution = Column(JSON, nullable=True)
@@ -22,4 +26,29 @@ class AnalysisResult(Base):
     linguistic_verdict = Column(Text, nullable=True)
     linguistic_signals = Column(JSON, nullable=True)
     model_version = Column(String, nullable=True)
+    result = Column(JSON, nullable=True) # Full pipeline output, as returned to the UI
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Idempotent upgrades for tables created before a column existed (create_all never alters)
+SCHEMA_PATCHES = [
+    "ALTER TABLE claims ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    # Backfill before the unique index, or every pre-existing claim (NULL hash) is inserted
+    # again on its next fetch. Same normalization as ml.core.cache.text_hash; where older
+    # rows already duplicate each other only the oldest gets the hash, the rest stay NULL
+    r"""
+    UPDATE claims SET content_hash = h.hash
+    FROM (
+        SELECT DISTINCT ON (hash) id, hash FROM (
+            SELECT id, encode(sha256(convert_to(btrim(regexp_replace(content, '\s+', ' ', 'g')), 'UTF8')), 'hex') AS hash
+            FROM claims WHERE content_hash IS NULL
+        ) hashed
+        ORDER BY hash, id
+    ) h
+    WHERE claims.id = h.id
+      AND NOT EXISTS (SELECT 1 FROM claims taken WHERE taken.content_hash = h.hash)
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_claims_content_hash ON claims (content_hash)",
+    "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS job_id VARCHAR",
+    "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS result JSON",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_analysis_results_job_id ON analysis_results (job_id)",
+]
@@ -0,0 +1,44 @@
+import uuid
+
+import pytest
+
+# claim_hash comes from ml.core.result_cache, which pulls in the embedding stack
+pytest.importorskip("numpy")
+from ml.workers import coalesce
+
+
+@pytest.fixture
+def claim(r):
+    text = f"Coalesce test claim {uuid.uuid4()}"
+    yield text
+    r.delete(coalesce.lock_key(text))
+
+
+def test_first_acquirer_owns_lock(r, claim):
+    assert coalesce.acquire(r, claim, "job-1") is None
+    assert r.get(coalesce.lock_key(claim)) == b"job-1"
+    assert 0 < r.ttl(coalesce.lock_key(claim)) <= coalesce.LOCK_TTL
+
+
+def test_second_acquirer_gets_first_job(r, claim):
+    before = int(r.get(coalesce.COUNTER_KEY) or 0)
+    assert coalesce.acquire(r, claim, "job-1") is None
+    # Same claim modulo case/punctuation/whitespace coalesces too
+    assert coalesce.acquire(r, "  " + claim.upper() + "!", "job-2") == "job-1"
+    assert r.get(coalesce.lock_key(claim)) == b"job-1"
+    assert int(r.get(coalesce.COUNTER_KEY)) == before + 1
+
+
+def test_only_owner_releases(r, claim):
+    assert coalesce.acquire(r, claim, "job-1") is None
+    coalesce.release(r, claim, "job-2")
+    assert r.get(coalesce.lock_key(claim)) == b"job-1"
+
+    coalesce.release(r, claim, "job-1")
+    assert r.get(coalesce.lock_key(claim)) is None
+    # Free again: the next submission starts its own pipeline
+    assert coalesce.acquire(r, claim, "job-3") is None
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,63 @@
+import uuid
+
+import pytest
+
+from ml import cost_limit
+from ml.cost_limit import COST_BUDGET, COST_WINDOW, CostLimitExceeded, charge, refund
+
+
+@pytest.fixture
+def client(r):
+    name = f"test-{uuid.uuid4()}"
+    yield name
+    r.delete(f"cost:{name}")
+
+
+def test_charge_up_to_budget(r, client):
+    assert charge(r, client, 1) == COST_BUDGET - 1
+    assert 0 < r.ttl(f"cost:{client}") <= COST_WINDOW
+    # Landing exactly on the budget is still allowed
+    assert charge(r, client, COST_BUDGET - 1) == 0
+
+
+def test_rejected_past_budget_with_retry_after(r, client):
+    charge(r, client, COST_BUDGET - 2)
+    with pytest.raises(CostLimitExceeded) as exc:
+        charge(r, client, 3)
+    assert exc.value.cost == 3
+    assert exc.value.remaining == 2
+    # Sent as the 429's Retry-After header: seconds until the window resets
+    assert isinstance(exc.value.retry_after, int)
+    assert 0 < exc.value.retry_after <= COST_WINDOW
+
+    # All-or-nothing: the rejected charge used no units, so a smaller one still fits
+    assert int(r.get(f"cost:{client}")) == COST_BUDGET - 2
+    assert charge(r, client, 2) == 0
+    with pytest.raises(CostLimitExceeded) as exc:
+        charge(r, client, 1)
+    assert exc.value.remaining == 0
+
+
+def test_refund(r, client):
+    charge(r, client, COST_BUDGET)
+    refund(r, client, 5)
+    assert charge(r, client, 5) == 0
+
+    # Never goes below zero
+    refund(r, client, COST_BUDGET * 2)
+    assert int(r.get(f"cost:{client}")) == 0
+
+
+def test_refund_after_window_expired(r, client):
+    refund(r, client, 5)
+    assert r.get(f"cost:{client}") is None
+
+
+def test_costs():
+    assert cost_limit.claim_cost(10) == 10 * cost_limit.COST_PER_CLAIM
+    assert cost_limit.heatmap_cost("occlusion") == cost_limit.COST_PER_HEATMAP["occlusion"]
+    assert cost_limit.heatmap_cost("unknown") == cost_limit.COST_PER_CLAIM
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-v"]))
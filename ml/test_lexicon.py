@@ -0,0 +1,85 @@
+import os
+import random
+import re
+import tempfile
+import time
+
+from ml.core.lexicon import Automaton, Lexicon, read_lexicons, LEXICON_DIR
+
+TEXTS = [
+    "SHOCKING: they don't want you to know the truth about the ice wall!!!",
+    "Vaccines cause autism, according to experts say because it's hidden",
+    "Russia attacked Ukraine; the war happened and the election was won.",
+    "The cure is real, secretly preventing risky things",
+    "5G kills. Bio-resonance frequency reset, wake up sheeple",
+    "",
+]
+
+
+def naive_terms(text, terms, whole_word=False):
+    """The matching the stylometer (`term in text`) and router (`\\bterm\\b`) did before."""
+    text = text.lower()
+    if whole_word:
+        return {t for t in terms if re.search(r"\b" + re.escape(t) + r"\b", text)}
+    return {t for t in terms if t in text}
+
+
+def test_shipped_lexicons_match_naive():
+    lexicons = read_lexicons(LEXICON_DIR)
+    automaton = Automaton(lexicons)
+    for text in TEXTS:
+        for whole_word in (False, True):
+            found = automaton.terms(text, whole_word=whole_word)
+            for category, terms in lexicons.items():
+                assert found.get(category, set()) == naive_terms(text, terms, whole_word), (text, category)
+
+
+def test_scan_offsets_match_naive_on_random_input():
+    rng = random.Random(0)
+    alphabet = "ab c"
+    for _ in range(300):
+        terms = {"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))).strip() or "a" for _ in range(20)}
+        text = "".join(rng.choice(alphabet) for _ in range(60))
+        hits = Automaton({"x": sorted(terms)}).scan(text)
+
+        expected = {(t, m.start()) for t in terms for m in re.finditer("(?=" + re.escape(t) + ")", text)}
+        expected_words = {(t, m.start()) for t in terms for m in re.finditer(r"(?=\b" + re.escape(t) + r"\b)", text)}
+        assert {(h.term, h.start) for h in hits} == expected
+        assert {(h.term, h.start) for h in hits if h.whole_word} == expected_words
+        for h in hits:
+            assert text[h.start:h.end] == h.term
+
+
+def test_term_in_several_categories():
+    automaton = Automaton({"red_flags": ["hidden", "secret"], "conspiracy": ["hidden", "secret agenda"]})
+    found = automaton.terms("A hidden secret agenda")
+    assert found == {"red_flags": {"hidden", "secret"}, "conspiracy": {"hidden", "secret agenda"}}
+
+
+def test_reload_after_edit():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "flags.txt")
+        with open(path, "w") as f:
+            f.write("# comment\nhoax\n")
+        lexicon = Lexicon(directory, reload_seconds=0)
+        assert lexicon.terms("Total HOAX and a cover-up") == {"flags": {"hoax"}}
+
+        with open(path, "w") as f:
+            f.write("hoax\ncover-up\n")
+        # Make sure the edit is visible even on filesystems with coarse mtimes
+        stamp = time.time_ns() + 10**9
+        os.utime(path, ns=(stamp, stamp))
+        assert lexicon.terms("Total HOAX and a cover-up") == {"flags": {"hoax", "cover-up"}}
+
+        # A new category file is picked up too
+        with open(os.path.join(directory, "events.txt"), "w") as f:
+            f.write("war\n")
+        assert lexicon.terms("war", whole_word=True) == {"events": {"war"}}
+
+
+if __name__ == "__main__":
+    test_shipped_lexicons_match_naive()
+    test_scan_offsets_match_naive_on_random_input()
+    test_term_in_several_categories()
+    test_reload_after_edit()
+    print("Lexicon tests passed")
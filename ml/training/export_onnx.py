@@ -0,0 +1,193 @@
+"""
+Export the inference models to ONNX (fp32 + dynamic int8) and verify them against PyTorch.
+
+For every model and backend the report gives label agreement with the eager
+PyTorch model on a sample set, and the speedup over PyTorch on the same batch.
+
+Usage:
+    python -m ml.training.export_onnx                       # export + verify
+    python -m ml.training.export_onnx --skip-export         # verify existing graphs
+    python -m ml.training.export_onnx --samples claims.jsonl --min-agreement 0.98
+
+Sample files are JSONL with a "text" field (a claim) and an optional "evidence" field.
+"""
+import argparse
+import json
+import os
+import sys
+
+# The reference side of the comparison must be eager PyTorch
+os.environ["INFERENCE_BACKEND"] = "torch"
+
+import numpy as np
+import torch
+
+from ml.core import onnx_backend
+from ml.core.nli import StanceClassifier
+from ml.core.stylometry import StylometricAnalyzer
+from ml.ingest import get_demo_claims
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+BACKENDS = ["onnx", "onnx-int8"]
+
+DEFAULT_CLAIMS = [
+    "The Earth is flat.",
+    "5G networks spread COVID-19.",
+    "Vaccines alter human DNA.",
+    "Climate change is caused by human activity.",
+    "Russia attacked Ukraine.",
+    "SHOCKING: they don't want you to know the truth about the ice wall!!!",
+]
+
+
+def load_samples(path):
+    evidence = [c["text"] for c in get_demo_claims()]
+    if not path:
+        return DEFAULT_CLAIMS, evidence
+
+    claims = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            claims.append(row["text"])
+            if row.get("evidence"):
+                evidence.append(row["evidence"])
+    return claims, evidence
+
+
+def verify_nli(nli, pairs):
+    torch_model = nli.model
+    reference = [nli._stance_from_probs(p)["label"] for p in nli._run_pairs(pairs)]
+    torch_time = onnx_backend.time_call(lambda: nli._run_pairs(pairs))
+
+    report = {"pytorch_seconds": torch_time}
+    for backend in BACKENDS:
+        nli.model = onnx_backend.wrap_sequence_classifier(torch_model, nli.model_name, "cpu", backend)
+        if nli.model is torch_model:
+            report[backend] = {"status": "unavailable"}
+            continue
+        labels = [nli._stance_from_probs(p)["label"] for p in nli._run_pairs(pairs)]
+        seconds = onnx_backend.time_call(lambda: nli._run_pairs(pairs))
+        report[backend] = {
+            "label_agreement": float(np.mean([a == b for a, b in zip(reference, labels)])),
+            "seconds": seconds,
+            "speedup": torch_time / seconds
+        }
+    nli.model = torch_model
+    return report
+
+
+def verify_stylometry(analyzer, texts, model_name):
+    inputs = analyzer.tokenizer(texts, padding=True, truncation=True, max_length=512, return_tensors="pt")
+
+    def run(model):
+        with torch.no_grad():
+            return model(**inputs).logits
+
+    reference = run(analyzer.model).argmax(dim=-1).tolist()
+    torch_time = onnx_backend.time_call(lambda: run(analyzer.model))
+
+    report = {"pytorch_seconds": torch_time}
+    for backend in BACKENDS:
+        model = onnx_backend.wrap_sequence_classifier(analyzer.model, model_name, "cpu", backend)
+        if model is analyzer.model:
+            report[backend] = {"status": "unavailable"}
+            continue
+        labels = run(model).argmax(dim=-1).tolist()
+        seconds = onnx_backend.time_call(lambda: run(model))
+        report[backend] = {
+            "label_agreement": float(np.mean([a == b for a, b in zip(reference, labels)])),
+            "seconds": seconds,
+            "speedup": torch_time / seconds
+        }
+    return report
+
+
+def verify_embeddings(st_model, claims, evidence):
+    def nearest(encoder):
+        c = encoder.encode(claims)
+        e = encoder.encode(evidence)
+        return c, e, (c @ e.T).argmax(axis=1)
+
+    ref_c, ref_e, ref_nn = nearest(st_model)
+    torch_time = onnx_backend.time_call(lambda: st_model.encode(evidence))
+
+    report = {"pytorch_seconds": torch_time}
+    for backend in BACKENDS:
+        encoder = onnx_backend.wrap_sentence_encoder(st_model, EMBEDDING_MODEL, "cpu", backend)
+        if encoder is st_model:
+            report[backend] = {"status": "unavailable"}
+            continue
+        c, e, nn = nearest(encoder)
+        cosine = (ref_e * e).sum(axis=1) / (np.linalg.norm(ref_e, axis=1) * np.linalg.norm(e, axis=1))
+        seconds = onnx_backend.time_call(lambda: encoder.encode(evidence))
+        report[backend] = {
+            # "Label" for an encoder = which evidence item is nearest to each claim
+            "label_agreement": float(np.mean(ref_nn == nn)),
+            "mean_cosine_to_pytorch": float(cosine.mean()),
+            "seconds": seconds,
+            "speedup": torch_time / seconds
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and verify ONNX inference backends.")
+    parser.add_argument("--samples", help="JSONL sample set (fields: text, optional evidence)")
+    parser.add_argument("--skip-export", action="store_true", help="Only verify existing graphs")
+    parser.add_argument("--min-agreement", type=float, default=0.95,
+                        help="Exit non-zero if any backend agrees with PyTorch less than this")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    claims, evidence = load_samples(args.samples)
+    pairs = [(ev, claim) for claim in claims for ev in evidence]
+
+    print("Loading PyTorch models...")
+    nli = StanceClassifier()
+    stylometer = StylometricAnalyzer()
+    st_model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+
+    if not args.skip_export:
+        print("Exporting to ONNX...")
+        onnx_backend.export_sequence_classifier(nli.model, nli.tokenizer, nli.model_name, pair=True)
+        # Save the stylometry head with its graph: PyTorch and XAI load this copy from now on
+        onnx_backend.save_checkpoint(stylometer.model, stylometer.tokenizer, stylometer.model_name)
+        onnx_backend.export_sequence_classifier(stylometer.model, stylometer.tokenizer, stylometer.model_name)
+        onnx_backend.export_sentence_encoder(st_model, EMBEDDING_MODEL)
+    elif not os.path.isdir(onnx_backend.checkpoint_dir(stylometer.model_name)):
+        # The reference would be a freshly drawn random head: agreement would be chance
+        print(f"❌ No saved checkpoint for {stylometer.model_name} next to its graph. Re-run without --skip-export.")
+        sys.exit(1)
+
+    print(f"Verifying on {len(claims)} claims / {len(pairs)} NLI pairs...")
+    report = {
+        nli.model_name: verify_nli(nli, pairs),
+        stylometer.model_name: verify_stylometry(stylometer, claims, stylometer.model_name),
+        EMBEDDING_MODEL: verify_embeddings(st_model, claims, evidence),
+    }
+
+    print(json.dumps(report, indent=2))
+    os.makedirs(onnx_backend.ONNX_MODEL_DIR, exist_ok=True)
+    report_path = os.path.join(onnx_backend.ONNX_MODEL_DIR, "verify_report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Report saved to {report_path}")
+
+    failed = [
+        f"{model}/{backend}"
+        for model, results in report.items()
+        for backend in BACKENDS
+        if results[backend].get("label_agreement", 1.0) < args.min_agreement
+    ]
+    if failed:
+        print(f"❌ Label agreement below {args.min_agreement}: {failed}")
+        sys.exit(1)
+    print("✅ All available backends agree with PyTorch.")
+
+
+if __name__ == "__main__":
+    main()
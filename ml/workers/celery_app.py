@@ -1,4 +1,5 @@
 from celery import Celery
+from kombu import Queue
 import os
 from dotenv import load_dotenv
 
@@ -14,11 +15,55 @@ celery_app = Celery(
     include=["ml.workers.tasks"]
 )
 
+# Queues, each consumed by its own worker service (docker-compose: worker-fast,
+# worker-inference, worker-fetch) so a slow queue never holds up another:
+#   fast      - cache checks, dispatch and aggregation (milliseconds, loads only the encoder)
+#   inference - model-bound stages (stylometry/XAI, retrieval + safety NLI, stance scoring)
+#   fetch     - live web fetch, ingestion and re-retrieval (seconds, I/O bound, no NLI)
+QUEUES = ("fast", "inference", "fetch")
+
+# Redis priorities: 0 is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 6
+PRIORITY_STEPS = list(range(10))
+PRIORITY_SEP = ":"
+
 celery_app.conf.update(
     task_serializer="json",
     accept_content=["json"],
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
-    broker_connection_retry_on_startup=True
+    broker_connection_retry_on_startup=True,
+    task_queues=[Queue(name) for name in QUEUES],
+    task_default_queue="fast",
+    task_routes={
+        "ml.workers.tasks.analyze_text_task": {"queue": "fast"},
+        "ml.workers.tasks.aggregate_analysis_task": {"queue": "fast"},
+        "ml.workers.tasks.style_stage_task": {"queue": "inference"},
+        "ml.workers.tasks.retrieval_stage_task": {"queue": "inference"},
+        "ml.workers.tasks.fetch_stage_task": {"queue": "fetch"},
+        "ml.workers.tasks.score_stage_task": {"queue": "inference"},
+        "ml.workers.tasks.heatmap_task": {"queue": "inference"},
+    },
+    broker_transport_options={
+        "priority_steps": PRIORITY_STEPS,
+        "sep": PRIORITY_SEP,
+        "queue_order_strategy": "priority",
+    },
+    task_default_priority=PRIORITY_INTERACTIVE,
+    # Don't let a process hoard low-priority messages while urgent ones queue up
+    worker_prefetch_multiplier=1,
 )
+
+
+def queue_depths(r):
+    """Messages waiting per queue (summed over the Redis priority sub-lists)."""
+    depths = {}
+    for name in QUEUES:
+        keys = [name] + [f"{name}{PRIORITY_SEP}{p}" for p in PRIORITY_STEPS if p]
+        pipe = r.pipeline()
+        for key in keys:
+            pipe.llen(key)
+        depths[name] = sum(pipe.execute())
+    return depths
@@ -0,0 +1,54 @@
+"""
+Single-flight coalescing of identical in-flight analyses.
+
+The first submission of a claim takes a Redis lock keyed by the normalized claim hash
+(SET NX with a TTL) that holds its job id. Identical submissions made while that lock
+exists get the same job id back instead of starting another pipeline. The lock is
+released when the task finishes, successfully or not; the TTL covers crashed workers.
+"""
+import os
+
+from ml.core.result_cache import claim_hash
+
+LOCK_TTL = int(os.getenv("INFLIGHT_LOCK_TTL", 300))
+COUNTER_KEY = "stats:coalesced_submissions"
+
+# Delete the lock only if it still belongs to this job (a TTL expiry may have handed it on)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def lock_key(text):
+    return f"inflight:{claim_hash(text)}"
+
+
+def acquire(r, text, job_id):
+    """
+    Try to register `job_id` as the in-flight analysis of `text`.
+    Returns None if this submission owns the lock (caller must enqueue `job_id`),
+    otherwise the job id of the analysis already in flight.
+    """
+    key = lock_key(text)
+    while True:
+        if r.set(key, job_id, nx=True, ex=LOCK_TTL):
+            return None
+        existing = r.get(key)
+        if existing is not None:
+            r.incr(COUNTER_KEY)
+            return existing.decode() if isinstance(existing, bytes) else existing
+        # Lock vanished between SET and GET (job just finished): try again
+
+
+def release(r, text, job_id):
+    r.eval(_RELEASE_SCRIPT, 1, lock_key(text), job_id)
+
+
+def stats(r):
+    return {
+        "coalesced_submissions": int(r.get(COUNTER_KEY) or 0),
+        "inflight": sum(1 for _ in r.scan_iter(match="inflight:*", count=1000)),
+    }
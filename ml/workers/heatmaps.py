@@ -0,0 +1,54 @@
+"""
+On-demand XAI heatmaps, cached in Redis by saliency method + text hash.
+
+Heatmaps are no longer computed inside the analysis pipeline (unless XAI_EAGER_HEATMAP=1):
+the UI asks /api/heatmap when someone opens the annotated text. The first request runs
+heatmap_task on the inference queue; later ones are served straight from Redis.
+A running average of each method's cost is kept so clients can pick a method up front.
+"""
+import json
+import os
+
+from ml.core.cache import text_hash
+
+# Mirrors ml.core.xai.SALIENCY_METHODS; importing xai here would pull torch into the API
+METHODS = ("gradient", "attention", "occlusion")
+HEATMAP_TTL = int(os.getenv("HEATMAP_CACHE_TTL", 7 * 86400))
+COST_KEY = "heatmap:cost"
+# Weight of the newest sample in the per-method running average
+COST_SMOOTHING = 0.2
+
+
+def cache_key(text, method):
+    # Case-sensitive: tokens (and so the heatmap) depend on the exact spelling
+    return f"heatmap:v1:{method}:{text_hash(text)}"
+
+
+def get(r, text, method):
+    raw = r.get(cache_key(text, method))
+    return json.loads(raw) if raw else None
+
+
+# Read-modify-write of the running average in one step, so concurrent tasks don't lose updates
+_COST_SCRIPT = """
+local ms = tonumber(ARGV[2])
+local previous = redis.call('hget', KEYS[1], ARGV[1])
+if previous then
+    ms = (1 - tonumber(ARGV[3])) * tonumber(previous) + tonumber(ARGV[3]) * ms
+end
+redis.call('hset', KEYS[1], ARGV[1], tostring(ms))
+return tostring(ms)
+"""
+
+
+def store(r, text, method, entry):
+    r.setex(cache_key(text, method), HEATMAP_TTL, json.dumps(entry))
+    r.eval(_COST_SCRIPT, 1, COST_KEY, method, entry["cost"]["ms"], COST_SMOOTHING)
+
+
+def method_costs(r):
+    """Average ms per saliency method seen so far ({} until something was computed)."""
+    return {
+        (k.decode() if isinstance(k, bytes) else k): round(float(v), 2)
+        for k, v in r.hgetall(COST_KEY).items()
+    }
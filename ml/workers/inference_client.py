@@ -0,0 +1,99 @@
+"""
+Worker-side proxies for the node-local inference server (see inference_server.py).
+They expose the same methods the pipeline already calls on the in-process models,
+so `get_models()` can swap them in without touching the task logic.
+"""
+import os
+import threading
+from multiprocessing.connection import Client
+
+import numpy as np
+
+from ml.core.nli import StanceClassifier
+from ml.workers.inference_server import authkey
+
+
+class InferenceClient:
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or os.getenv("INFERENCE_SOCKET", "/tmp/prism/inference.sock")
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def call(self, op, items=None):
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.socket_path, family="AF_UNIX", authkey=authkey())
+            try:
+                self._conn.send((op, items))
+                status, payload = self._conn.recv()
+            except (EOFError, OSError):
+                # Server restarted: drop the connection so the next call reconnects
+                self._conn = None
+                raise
+        if status != "ok":
+            raise RuntimeError(f"Inference server error ({op}): {payload}")
+        return payload
+
+
+class RemoteStanceClassifier(StanceClassifier):
+    """StanceClassifier whose uncached forward passes run on the inference server."""
+
+    def __init__(self, client, batch_size=None):
+        # No super().__init__: the model itself lives on the server
+        self.client = client
+        self.device = "remote"
+        info = client.call("info")
+        print(f"NLI Stance Classifier using inference server at {client.socket_path}")
+
+        self._init_cache(info["nli_model"], batch_size)
+        self._init_labels(info["nli_label_mapping"], source="inference server")
+        self.backend = info["nli_backend"]
+
+    def _run_pairs(self, pairs, batch_size=None):
+        return self.client.call("nli", [tuple(p) for p in pairs])
+
+
+class RemoteXAIExplainer:
+    """Stylometry + XAI heatmap computed on the inference server."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def analyze_with_heatmap(self, text):
+        return self.client.call("style", [text])[0]
+
+    def analyze_with_heatmap_batch(self, texts, batch_size=None):
+        return self.client.call("style", list(texts))
+
+    def explain(self, text, method="gradient"):
+        return self.explain_with_cost(text, method)[0]
+
+    def explain_with_cost(self, text, method="gradient"):
+        heatmap, cost = self.client.call("explain", [(text, method)])[0]
+        return heatmap, cost
+
+
+class RemoteStylometer:
+    """Stylometric analysis (no heatmap) computed on the inference server."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def analyze(self, text):
+        return self.client.call("analyze", [text])[0]
+
+
+class RemoteEncoder:
+    """Drop-in for SentenceTransformer.encode backed by the inference server."""
+
+    def __init__(self, client):
+        self.client = client
+        # Cache keys and Chroma collections follow the server's backend, not this worker's env
+        self.backend = client.call("info")["embedding_backend"]
+
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        vectors = self.client.call("embed", [sentences] if single else list(sentences))
+        if single:
+            return vectors[0]
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
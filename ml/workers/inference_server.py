@@ -0,0 +1,205 @@
+"""
+Node-local model server.
+
+Holds one copy of RoBERTa (stylometry + XAI), the NLI cross-encoder and MiniLM,
+and serves every Celery prefork child on the node over a Unix socket.
+Concurrent requests for the same model are grouped into micro-batches: a batch
+is closed when it reaches INFERENCE_MAX_BATCH items or INFERENCE_MAX_WAIT_MS
+after its first request arrived, whichever comes first.
+
+Run with:  python -m ml.workers.inference_server
+
+multiprocessing.connection unpickles what it receives, so the socket is created 0600
+and every connection must pass the INFERENCE_AUTHKEY handshake (same key on both ends).
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+SOCKET_PATH = os.getenv("INFERENCE_SOCKET", "/tmp/prism/inference.sock")
+MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", 32))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 10))
+
+
+def authkey():
+    """Shared secret for the socket handshake; there is deliberately no default."""
+    key = os.getenv("INFERENCE_AUTHKEY")
+    if not key:
+        raise RuntimeError("INFERENCE_AUTHKEY must be set (the same value for the inference server and workers)")
+    return key.encode()
+
+
+class MicroBatcher:
+    """
+    Collects requests (each a list of items) from many connections and runs `fn`
+    once per micro-batch over the concatenated items.
+    """
+
+    def __init__(self, name, fn, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.name = name
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.thread = threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, items):
+        future = Future()
+        self.queue.put((items, future))
+        return future
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            flat = [item for items, _ in batch for item in items]
+            try:
+                outputs = self.fn(flat) if flat else []
+            except Exception as e:
+                if len(batch) == 1:
+                    print(f"InferenceServer: {self.name} request failed: {e}")
+                    batch[0][1].set_exception(e)
+                    continue
+                # One bad request (malformed item, OOM on a long input) must not fail the
+                # unrelated requests merged with it: rerun them one by one
+                print(f"InferenceServer: {self.name} batch failed ({e}); retrying its {len(batch)} requests separately")
+                self._run_separately(batch)
+                continue
+
+            self.batches += 1
+            self.items += len(flat)
+            offset = 0
+            for items, future in batch:
+                future.set_result(outputs[offset:offset + len(items)])
+                offset += len(items)
+
+    def _run_separately(self, batch):
+        for items, future in batch:
+            try:
+                outputs = self.fn(items) if items else []
+            except Exception as e:
+                print(f"InferenceServer: {self.name} request failed: {e}")
+                future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(items)
+            future.set_result(outputs)
+
+
+class InferenceServer:
+    def __init__(self, socket_path=SOCKET_PATH):
+        from ml.core.stylometry import StylometricAnalyzer
+        from ml.core.xai import XAIExplainer
+        from ml.core.nli import StanceClassifier
+        from sentence_transformers import SentenceTransformer
+        import torch
+
+        self.socket_path = socket_path
+        print("InferenceServer: Loading models...")
+        self.stylometer = StylometricAnalyzer()
+        self.xai = XAIExplainer(self.stylometer)
+        self.nli = StanceClassifier()
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.embedder = SentenceTransformer('all-MiniLM-L6-v2', device=device)
+
+        self.batchers = {
+            "style": MicroBatcher("style", self.xai.analyze_with_heatmap_batch),
+            "analyze": MicroBatcher("analyze", self._analyze),
+            "explain": MicroBatcher("explain", self._explain),
+            "nli": MicroBatcher("nli", self.nli._run_pairs),
+            "embed": MicroBatcher("embed", self._embed),
+        }
+
+    def _analyze(self, texts):
+        # Stylometry without the saliency backward pass (heatmaps are on demand). Workers in the
+        # heuristic tier score locally, so requests that get here always want the model
+        return [self.stylometer.analyze(text, use_model=True) for text in texts]
+
+    def _explain(self, items):
+        return [self.xai.explain_with_cost(text, method) for text, method in items]
+
+    def _embed(self, texts):
+        return list(self.embedder.encode(texts, batch_size=MAX_BATCH, convert_to_numpy=True))
+
+    def info(self):
+        from ml.core.onnx_backend import backend_of
+        return {
+            "nli_model": self.nli.model_name,
+            "nli_label_mapping": self.nli.label_mapping,
+            "nli_backend": self.nli.backend,
+            "embedding_backend": backend_of(self.embedder),
+            "stats": {
+                name: {"batches": b.batches, "items": b.items}
+                for name, b in self.batchers.items()
+            }
+        }
+
+    def _serve_connection(self, conn):
+        try:
+            while True:
+                try:
+                    op, items = conn.recv()
+                except EOFError:
+                    break
+                try:
+                    if op == "info":
+                        conn.send(("ok", self.info()))
+                        continue
+                    if op not in self.batchers:
+                        raise ValueError(f"Unknown op '{op}'")
+                    conn.send(("ok", self.batchers[op].submit(items).result()))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        key = authkey()
+        os.makedirs(os.path.dirname(self.socket_path), mode=0o700, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        # Owner-only socket (0600) from the moment it exists
+        old_umask = os.umask(0o177)
+        try:
+            listener = Listener(self.socket_path, family="AF_UNIX", authkey=key)
+        finally:
+            os.umask(old_umask)
+        print(f"InferenceServer: Listening on {self.socket_path} "
+              f"(max_batch={MAX_BATCH}, max_wait={MAX_WAIT_MS}ms)")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, OSError) as e:
+                    print(f"InferenceServer: Rejected connection: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+
+if __name__ == "__main__":
+    InferenceServer().serve_forever()
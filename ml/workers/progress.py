@@ -0,0 +1,82 @@
+"""
+Per-job progress events, pushed from the worker to the API over Redis pub/sub.
+
+Every event is also appended to a short-lived Redis list, so a client that subscribes
+after the job has started (or reconnects) replays what it missed before following the
+live channel. An event's sequence number is its 1-based position in that list.
+"""
+import json
+import os
+import time
+
+LOG_TTL = int(os.getenv("PROGRESS_LOG_TTL", 600))
+HEARTBEAT_SECONDS = float(os.getenv("PROGRESS_HEARTBEAT_SECONDS", 15))
+
+TERMINAL_STAGES = ("final", "failed")
+
+
+def channel(job_id):
+    return f"progress:{job_id}"
+
+
+def log_key(job_id):
+    return f"progress-log:{job_id}"
+
+
+class ProgressPublisher:
+    """Worker side. Publishing is best effort: a Redis hiccup never fails the analysis."""
+
+    def __init__(self, r, job_id):
+        self.redis = r
+        self.job_id = job_id
+
+    def emit(self, stage, **data):
+        if not self.job_id:
+            return
+        event = {"stage": stage, "data": data, "ts": round(time.time(), 3)}
+        try:
+            raw = json.dumps(event, default=str)
+            seq = self.redis.rpush(log_key(self.job_id), raw)
+            self.redis.expire(log_key(self.job_id), LOG_TTL)
+            self.redis.publish(channel(self.job_id), json.dumps({"seq": seq, "event": raw}))
+        except Exception as e:
+            print(f"Progress: could not publish '{stage}' for {self.job_id}: {e}")
+
+
+async def listen(job_id, after=0, heartbeat=HEARTBEAT_SECONDS):
+    """
+    API side. Async generator of (seq, event) for `job_id`, starting after sequence
+    number `after`. Yields (None, None) every `heartbeat` seconds without traffic so
+    the caller can keep the connection alive. Runs until the caller stops iterating.
+
+    If the log is shorter than `after` it expired (and may have restarted at 1 when the
+    worker emitted again), so the whole current log is replayed instead of skipping it.
+    """
+    import redis.asyncio as aioredis
+
+    r = aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    pubsub = r.pubsub()
+    try:
+        # Subscribe before reading the log so nothing published in between is lost
+        await pubsub.subscribe(channel(job_id))
+        if await r.llen(log_key(job_id)) < after:
+            after = 0
+        last = after
+        for seq, raw in enumerate(await r.lrange(log_key(job_id), after, -1), after + 1):
+            last = seq
+            yield seq, json.loads(raw)
+
+        while True:
+            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat)
+            if msg is None:
+                yield None, None
+                continue
+            payload = json.loads(msg["data"])
+            if payload["seq"] <= last:
+                continue  # already replayed from the log
+            last = payload["seq"]
+            yield last, json.loads(payload["event"])
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+        await r.aclose()
@@ -0,0 +1,295 @@
+"""
+Write-behind persistence of finished analyses into `analysis_results`.
+
+Tasks hand results to a bounded in-memory queue and return immediately; a background
+thread drains it into Postgres with one multi-row INSERT per batch. The queue is
+flushed when the worker process shuts down.
+
+Nothing is dropped because Postgres is slow or down:
+  - a batch that fails on a connection error is retried with exponential backoff
+    (RESULT_SINK_MAX_RETRIES attempts); if it still fails, its rows are spilled
+  - results that don't fit in a full queue are spilled too
+  - on shutdown, a batch waiting to retry is spilled at once instead of sleeping out
+    its backoff (and close() spills whatever the writer still holds after its timeout)
+  - spilled rows go to a JSONL file in RESULT_SINK_SPILL_DIR and are written back
+    once the queue has room (a process that died with a spill file is picked up by
+    the next one to start)
+A batch rejected for its data is split in halves until the bad row is isolated, so
+one bad row never costs the others; only such rows are counted as failed.
+"""
+import asyncio
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+MAX_QUEUE = int(os.getenv("RESULT_SINK_MAX_QUEUE", 1000))
+BATCH_SIZE = int(os.getenv("RESULT_SINK_BATCH_SIZE", 50))
+FLUSH_INTERVAL = float(os.getenv("RESULT_SINK_FLUSH_SECONDS", 2))
+MAX_RETRIES = int(os.getenv("RESULT_SINK_MAX_RETRIES", 5))
+RETRY_BASE_SECONDS = float(os.getenv("RESULT_SINK_RETRY_BASE_SECONDS", 0.5))
+RETRY_MAX_SECONDS = 30.0
+SPILL_DIR = os.getenv("RESULT_SINK_SPILL_DIR", "/tmp/prism-result-sink")
+# How often an idle writer looks for spilled rows to write back
+SPILL_CHECK_SECONDS = 10.0
+
+_STOP = object()
+
+
+def to_row(job_id, result, claim_id=None):
+    meta = result.get("meta", {})
+    return {
+        "job_id": job_id,
+        "claim_id": claim_id,
+        "style_risk_score": result.get("risk_score", result.get("style_risk_score")),
+        "stance_distribution": result.get("stance_summary"),
+        "explanation": result.get("quality_note"),
+        "linguistic_verdict": result.get("linguistic_verdict"),
+        "linguistic_signals": result.get("linguistic_signals"),
+        "model_version": f"{meta.get('app_version', '')}/{meta.get('model_type', '')}",
+        "result": result,
+    }
+
+
+def is_transient(exc):
+    """Connection-level failures (worth retrying) as opposed to a row Postgres rejects."""
+    from sqlalchemy.exc import OperationalError, InterfaceError, DBAPIError
+
+    if isinstance(exc, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)):
+        return True
+    return isinstance(exc, DBAPIError) and exc.connection_invalidated
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ResultSink:
+    def __init__(self, max_queue=MAX_QUEUE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 spill_dir=SPILL_DIR):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_dir = spill_dir
+        self.spill_path = os.path.join(spill_dir, f"result-sink-{os.getpid()}.jsonl")
+        self._spill_lock = threading.Lock()
+        self._stopping = threading.Event()
+        # Batch the writer is working on, so close() can still spill it if the writer hangs
+        self._current = []
+        self.written = 0
+        self.spilled = 0
+        self.retried = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="result-sink", daemon=True)
+        self._thread.start()
+
+    def submit(self, job_id, result, claim_id=None):
+        if not job_id:
+            return
+        row = to_row(job_id, result, claim_id)
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            print(f"ResultSink: queue full, spilling result for {job_id} to {self.spill_path}")
+            self._spill([row])
+
+    def close(self, timeout=10):
+        """Flush everything queued so far, then stop the writer thread."""
+        self._stopping.set()
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Writer stuck (e.g. connecting to an unreachable Postgres): keep its batch and
+            # what is still queued for the next process. Rows that did get written are
+            # skipped on write-back by ON CONFLICT (job_id)
+            leftover = list(self._current)
+            while True:
+                try:
+                    row = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is not _STOP:
+                    leftover.append(row)
+            if leftover:
+                self._spill(leftover)
+
+    # --- Spill file ---
+
+    def _spill(self, rows):
+        with self._spill_lock:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.spilled += len(rows)
+
+    def _claim_spill_files(self):
+        """Take over this process's spill file and those left by dead processes."""
+        claimed = []
+        for path in glob.glob(os.path.join(self.spill_dir, "result-sink-*.jsonl")):
+            pid = int(path.rsplit("-", 1)[1].split(".")[0])
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            draining = f"{path}.draining-{os.getpid()}-{time.time_ns()}"
+            try:
+                with self._spill_lock:
+                    os.rename(path, draining)  # atomic: only one process gets each file
+            except FileNotFoundError:
+                continue
+            claimed.append(draining)
+        # Our own leftovers from an interrupted drain
+        claimed += glob.glob(os.path.join(self.spill_dir, f"result-sink-*.jsonl.draining-{os.getpid()}-*"))
+        return sorted(set(claimed))
+
+    def _drain_spill(self, loop, engine):
+        for path in self._claim_spill_files():
+            with open(path, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            print(f"ResultSink: writing back {len(rows)} spilled results from {path}")
+            for start in range(0, len(rows), self.batch_size):
+                loop.run_until_complete(self._write(engine, rows[start:start + self.batch_size]))
+            os.unlink(path)
+
+    # --- Writer thread ---
+
+    def _next_batch(self):
+        """Wait for the first row, then gather more until the batch is full or the interval passes."""
+        try:
+            first = self.queue.get(timeout=SPILL_CHECK_SECONDS)
+        except queue.Empty:
+            return [], False
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                row = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _run(self):
+        # The writer owns its own event loop and async engine (engines are loop-bound)
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from ml.database import DATABASE_URL
+
+        loop = asyncio.new_event_loop()
+        engine = create_async_engine(DATABASE_URL, pool_size=1, max_overflow=0)
+        try:
+            while True:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._current = batch
+                    loop.run_until_complete(self._write(engine, batch))
+                    self._current = []
+                if stop:
+                    break
+                if self._stopping.is_set():
+                    continue
+                # Write spilled rows back only while the queue has room to spare
+                if self.queue.qsize() < self.queue.maxsize // 2:
+                    self._drain_spill(loop, engine)
+        finally:
+            loop.run_until_complete(engine.dispose())
+            loop.close()
+
+    async def _insert(self, engine, rows):
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        from ml.models import AnalysisResult
+
+        async with engine.begin() as conn:
+            await conn.execute(
+                pg_insert(AnalysisResult).values(rows).on_conflict_do_nothing(index_elements=["job_id"])
+            )
+
+    async def _write(self, engine, rows):
+        delay = RETRY_BASE_SECONDS
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                await self._insert(engine, rows)
+                self.written += len(rows)
+                return
+            except Exception as e:
+                if not is_transient(e):
+                    if len(rows) > 1:
+                        # Isolate the bad row instead of losing the whole batch
+                        mid = len(rows) // 2
+                        await self._write(engine, rows[:mid])
+                        await self._write(engine, rows[mid:])
+                    else:
+                        self.failed += 1
+                        print(f"ResultSink: dropping result for {rows[0]['job_id']}: {e}")
+                    return
+                if attempt == MAX_RETRIES:
+                    print(f"ResultSink: {len(rows)} results still failing after {MAX_RETRIES} retries ({e}); spilling")
+                    self._spill(rows)
+                    return
+                if self._stopping.is_set():
+                    print(f"ResultSink: write failed during shutdown ({e}); spilling {len(rows)} results")
+                    self._spill(rows)
+                    return
+                self.retried += 1
+                print(f"ResultSink: write failed ({e}), retrying in {delay:.1f}s")
+                # close() wakes this up, so shutdown never waits out the backoff
+                if await asyncio.to_thread(self._stopping.wait, delay):
+                    print(f"ResultSink: shutting down; spilling {len(rows)} results instead of retrying")
+                    self._spill(rows)
+                    return
+                delay = min(delay * 2, RETRY_MAX_SECONDS)
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "spilled": self.spilled,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    """Per-process sink, started lazily (after Celery forks the worker child)."""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = ResultSink()
+        return _sink
+
+
+def shutdown_sink():
+    global _sink
+    with _sink_lock:
+        if _sink is not None:
+            print(f"ResultSink: flushing on shutdown ({_sink.stats()})")
+            _sink.close()
+            _sink = None
+
+
+async def load_result(job_id):
+    """Persisted result for `job_id`, or None. Served by the unique index on job_id."""
+    from sqlalchemy import select
+    from ml.database import AsyncSessionLocal
+    from ml.models import AnalysisResult
+
+    async with AsyncSessionLocal() as session:
+        row = await session.execute(
+            select(AnalysisResult.result).where(AnalysisResult.job_id == job_id)
+        )
+        return row.scalars().first()
@@ -1,15 +1,22 @@
 from ml.workers.celery_app import celery_app
 import time
 import asyncio
-import json
-import hashlib
 import redis
 import os
-from ml.core.stylometry import StylometricAnalyzer
+from ml.core.stylometry import StylometricAnalyzer, STYLOMETRY_TIER
 from ml.core.rag import EvidenceRetriever
 from ml.core.nli import StanceClassifier
 from ml.core.xai import XAIExplainer
 from ml.core.reputation import ReputationChecker
+from ml.core import resources
+from ml.core.result_cache import ResultCache
+from ml.workers.result_sink import get_sink, shutdown_sink
+from celery import chain, chord
+from celery.signals import worker_process_shutdown, worker_ready, task_postrun
+from ml.workers import coalesce, heatmaps
+from ml.workers.progress import ProgressPublisher
+from ml import metrics
+from ml.metrics import Timings
 
 # Singleton models in worker process
 stylometer = None
@@ -18,42 +25,213 @@ nli = None
 xai = None
 reputation = None
 
-def get_models():
-    global stylometer, retriever, nli, xai, reputation
-    if not stylometer:
-        print("Worker: Loading models...")
-        stylometer = StylometricAnalyzer()
-        retriever = EvidenceRetriever()
-        nli = StanceClassifier()
-        xai = XAIExplainer(stylometer)
-        reputation = ReputationChecker()
-    return stylometer, retriever, nli, xai, reputation
+# Run the pipeline stages as a Celery chord across worker processes (0 = all inline)
+ANALYSIS_CANVAS = os.getenv("ANALYSIS_CANVAS", "1").lower() in ("1", "true", "yes")
 
-@celery_app.task(bind=True)
-def analyze_text_task(self, text, claim_id=None):
+# Speculative fetching: start Lane A and Lane B together instead of falling back sequentially
+SPECULATIVE_FETCH = os.getenv("SPECULATIVE_FETCH", "0").lower() in ("1", "true", "yes")
+# A lane "wins" once it returns at least this many items
+LANE_SUFFICIENT_RESULTS = int(os.getenv("LANE_SUFFICIENT_RESULTS", 1))
+
+# Heatmaps cost a backward pass; by default they are computed on demand (POST /api/heatmap)
+XAI_EAGER_HEATMAP = os.getenv("XAI_EAGER_HEATMAP", "0").lower() in ("1", "true", "yes")
+
+async def timed_lane(lane, coro, lane_meta):
+    """Await one lane's fetch, recording its status, item count and wall time in `lane_meta`."""
+    start = time.perf_counter()
+    try:
+        items = await coro
+        lane_meta[lane] = {"status": "completed", "items": len(items),
+                           "seconds": round(time.perf_counter() - start, 3)}
+        return items
+    except asyncio.CancelledError:
+        lane_meta[lane] = {"status": "cancelled", "seconds": round(time.perf_counter() - start, 3)}
+        raise
+    except Exception as e:
+        print(f"Worker: {lane} failed: {e}")
+        lane_meta[lane] = {"status": "failed", "error": str(e),
+                           "seconds": round(time.perf_counter() - start, 3)}
+        return []
+
+async def fetch_lanes_speculatively(text, priorities, lane_meta):
     """
-    Full async analysis pipeline.
+    Start every lane at once. Lanes are consumed in priority order: as soon as one
+    returns at least LANE_SUFFICIENT_RESULTS items, the lower-priority lanes still
+    running are cancelled. Otherwise their results are merged in, as the sequential
+    fallback would have done. Returns the raw items to ingest.
     """
-    stylometer, retriever, nli, xai, reputation = get_models()
-    quality_note = "Verified" # Default status
+    from ml.ingest import fetch_claims
+    from ml.core.news_fetcher import NewsFetcher
+    
+    fetchers = {
+        "lane_a": lambda: fetch_claims(query=text),
+        "lane_b": lambda: NewsFetcher().search_news_async(text, max_results=30),
+    }
+    tasks = [asyncio.create_task(timed_lane(lane, fetchers[lane](), lane_meta)) for lane in priorities]
+    
+    collected = []
+    try:
+        for lane, task in zip(priorities, tasks):
+            items = await task
+            if items:
+                lane_meta[lane]["used"] = True
+                collected.extend(items)
+            if len(items) >= LANE_SUFFICIENT_RESULTS:
+                print(f"Worker: {lane} sufficient ({len(items)} items).")
+                break
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return collected
+
+@worker_process_shutdown.connect
+def flush_result_sink(pid=None, **kwargs):
+    # Write-behind queue must reach Postgres before the child exits
+    shutdown_sink()
+    metrics.mark_process_dead(pid or os.getpid())
+
+@worker_ready.connect
+def start_metrics_exporter(**kwargs):
+    # Main worker process: serves metrics aggregated over the pool's children
+    port = int(os.getenv("WORKER_METRICS_PORT", 9808))
+    if port:
+        metrics.start_exporter(port)
+        print(f"Worker: Prometheus metrics on :{port}/metrics")
+
+@task_postrun.connect
+def finish_analysis(sender=None, task_id=None, args=None, kwargs=None, **extra):
+    # Runs after success and failure alike: streams get their terminal event and
+    # a failed job never pins the claim's in-flight lock
+    state = extra.get("state")
+    if sender not in (analyze_text_task, aggregate_analysis_task) + STAGE_TASKS:
+        return
+    # Export this process's model-cache counters
+    if nli is not None:
+        metrics.record_cache_stats("nli", nli.cache.stats())
+    if retriever is not None:
+        metrics.record_cache_stats("embedding", retriever.embedding_model.cache.stats())
+    
+    if sender is analyze_text_task and state == "IGNORED":
+        return  # replaced by the canvas; aggregate_analysis_task reports instead
+    if sender in STAGE_TASKS and state == "SUCCESS":
+        return  # intermediate stage
+    kwargs = kwargs or {}
+    job_id = kwargs.get("job_id") or task_id
+    text = kwargs.get("text") or (args[0] if args and isinstance(args[0], str) else None)
     
-    # 0. Caching Check
     r = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
-    cache_key = f"cache:v1:{hashlib.md5(text.encode()).hexdigest()}"
-    cached = r.get(cache_key)
-    if cached:
-        print(f"Worker: Returning cached result for {cache_key}")
-        return json.loads(cached)
+    # Terminal progress event (the result is already stored in the backend at this point)
+    progress = ProgressPublisher(r, job_id)
+    if state == "SUCCESS":
+        progress.emit("final", result=extra.get("retval"))
+    else:
+        progress.emit("failed", error=str(extra.get("retval")))
     
-    # 1. Stylometric Risk
-    style_analysis = stylometer.analyze(text)
+    if not text:
+        return
+    try:
+        coalesce.release(r, text, job_id)
+    except Exception as e:
+        print(f"Worker: could not release in-flight lock: {e}")
+
+_inference_client = None
+
+def inference_client():
+    """Connection to the node-local inference server, or None when models run in-process."""
+    global _inference_client
+    if _inference_client is None and os.getenv("INFERENCE_SOCKET"):
+        from ml.workers.inference_client import InferenceClient
+        print(f"Worker: Using inference server at {os.getenv('INFERENCE_SOCKET')}")
+        _inference_client = InferenceClient()
+    return _inference_client
+
+def get_encoder():
+    """
+    The query encoder alone. It is all the result cache needs, so the fast queue
+    (cache checks, aggregation) never loads the stylometry or NLI models.
+    """
+    client = inference_client()
+    if client is not None:
+        # Models live in the node-local inference server; this process only holds a proxy
+        from ml.workers.inference_client import RemoteEncoder
+        from ml.core.embeddings import CachedEncoder
+        return resources.get_or_create(
+            ("embedding_model", resources.EMBEDDING_MODEL),
+            lambda: CachedEncoder(RemoteEncoder(client), resources.EMBEDDING_MODEL)
+        )
+    return resources.get_embedding_model()
+
+def get_retriever():
+    """Retriever (encoder + Chroma) without the other models: enough for the fetch stage."""
+    global retriever
+    if retriever is None:
+        get_encoder()  # registers the inference-server proxy first, if there is one
+        retriever = EvidenceRetriever()
+    return retriever
+
+def get_models():
+    global stylometer, nli, xai, reputation
+    if not reputation:
+        client = inference_client()
+        if client is not None:
+            from ml.workers.inference_client import RemoteStanceClassifier, RemoteXAIExplainer, RemoteStylometer
+            # The heuristic tier needs no model, so it runs here instead of over the socket
+            stylometer = RemoteStylometer(client) if STYLOMETRY_TIER == "model" else StylometricAnalyzer()
+            nli = RemoteStanceClassifier(client)
+            xai = RemoteXAIExplainer(client)
+        else:
+            print("Worker: Loading models...")
+            stylometer = StylometricAnalyzer()
+            nli = StanceClassifier()
+            xai = XAIExplainer(stylometer)
+        reputation = ReputationChecker()
+    return stylometer, get_retriever(), nli, xai, reputation
+
+# Stages of the analysis pipeline. Each takes plain JSON-able inputs and returns a
+# JSON-able dict, so it can run inline or as its own Celery task (see ANALYSIS_CANVAS).
+
+def style_stage(text, progress):
+    """Stylometric risk (+ XAI heatmap when XAI_EAGER_HEATMAP is on)."""
+    stylometer, retriever, nli, xai, reputation = get_models()
+    timings = Timings()
+    
+    # 1 + 2. Stylometric Risk & XAI Heatmap (one shared RoBERTa forward pass)
+    if XAI_EAGER_HEATMAP:
+        with timings.span("stylometry_xai"):
+            style_analysis, heatmap = xai.analyze_with_heatmap(text)
+    else:
+        # Forward pass only; the heatmap is computed on demand by /api/heatmap
+        with timings.span("stylometry"):
+            style_analysis, heatmap = stylometer.analyze(text), []
     style_risk = style_analysis["score"]
+    progress.emit("stylometry", style_risk_score=style_risk,
+                  linguistic_verdict=style_analysis.get("verdict", ""),
+                  linguistic_signals=style_analysis.get("signals", []))
+    if XAI_EAGER_HEATMAP:
+        progress.emit("heatmap", heatmap=heatmap)
     
-    # 2. XAI Heatmap
-    heatmap = xai.explain(text)
+    return {
+        "score": style_risk,
+        "verdict": style_analysis.get("verdict", ""),
+        "signals": style_analysis.get("signals", []),
+        "heatmap": heatmap,
+        "heatmap_mode": "eager" if XAI_EAGER_HEATMAP else "on_demand",
+        "tier": style_analysis.get("tier", "model"),
+        # False for a remote stylometer too: the model lives in the inference server
+        "model_loaded": getattr(stylometer, "model_loaded", False),
+        "timings": timings.spans
+    }
+
+def retrieval_stage(text, progress):
+    """Internal evidence retrieval + semantic safety check."""
+    stylometer, retriever, nli, xai, reputation = get_models()
+    timings = Timings()
     
     # 3. Retrieve Evidence
-    evidence_list = retriever.retrieve(text)
+    with timings.span("retrieval"):
+        evidence_list = retriever.retrieve(text)
     
     # Trust Gating: TIGHTENED from 1.4 → 1.0
     # Cosine distance > 1.0 means the evidence is barely related to the claim.
@@ -63,12 +241,38 @@ def analyze_text_task(self, text, claim_id=None):
     original_count = len(evidence_list)
     evidence_list = [e for e in evidence_list if e['score'] < STRICT_THRESHOLD] 
     print(f"Worker: Initial retrieval: {original_count} raw → {len(evidence_list)} after threshold {STRICT_THRESHOLD}")
+    progress.emit("retrieval", total_retrieved=original_count, after_threshold=len(evidence_list))
+    
+    # SAFETY OVERRIDE: Semantic Check
+    with timings.span("safety"):
+        is_safety_critical = nli.check_safety(text)
+    
+    return {
+        "evidence": evidence_list,
+        "original_count": original_count,
+        "is_safety_critical": is_safety_critical,
+        "timings": timings.spans
+    }
+
+def evidence_stage(retrieval, text, progress):
+    """Reactive fetching, relevance gating, stance scoring and diversity re-ranking."""
+    return score_stage(fetch_stage(retrieval, text, progress), text, progress)
+
+def fetch_stage(retrieval, text, progress):
+    """
+    Reactive fetching: live fetch + ingestion when internal evidence is missing or weak,
+    then retrieval again. I/O bound and needs no NLI model (runs on the "fetch" queue).
+    """
+    retriever = get_retriever()
+    evidence_list = retrieval["evidence"]
+    original_count = retrieval["original_count"]
+    is_safety_critical = retrieval["is_safety_critical"]
+    timings = Timings(retrieval.get("timings"))
+    quality_note = "Verified" # Default status
     
     # REACTIVE RAG & 3-LANE ROUTER
     should_fetch = False
-    
-    # SAFETY OVERRIDE: Semantic Check
-    is_safety_critical = nli.check_safety(text)
+    fetch_meta = {"mode": "speculative" if SPECULATIVE_FETCH else "sequential", "lanes": {}}
     
     if is_safety_critical:
          print(f"Worker: Semantic Safety Check TRIGGERED. FORCING FETCH.")
@@ -88,34 +292,49 @@ def analyze_text_task(self, text, claim_id=None):
         
         try:
             from ml.core.router import EvidenceRouter
-            from ml.ingest import fetch_claims, save_claims
+            from ml.ingest import stream_claims, ingest_stream, save_claims, wait_for_indexing
             from ml.core.news_fetcher import NewsFetcher
             
             router = EvidenceRouter()
-            route = router.route(text)
+            priorities = router.priorities(text)
+            route = priorities[0]
+            fetch_meta["priorities"] = priorities
             print(f"Worker: Route selected -> {route}")
+            progress.emit("fetch_started", route=route, priorities=priorities,
+                          speculative=SPECULATIVE_FETCH)
             
             async def run_smart_fetch():
                 new_data = []
+                fc_data = []
+                fresh = []
+                lanes = fetch_meta["lanes"]
+                
+                if SPECULATIVE_FETCH:
+                    print(f"Worker: Running lanes speculatively {priorities}...")
+                    new_data = await fetch_lanes_speculatively(text, priorities, lanes)
                 
                 # Lane A: Fact Check API (Specific Claims)
-                if route == "lane_a":
+                elif route == "lane_a":
                     print("Worker: Running Lane A (Fact Checks)...")
-                    fc_data = await fetch_claims(query=text)
-                    if fc_data: new_data.extend(fc_data)
+                    # Pages are embedded and saved while later pages download
+                    async def lane_a():
+                        claims, fc_fresh = await ingest_stream(stream_claims(query=text))
+                        fresh.extend(fc_fresh)
+                        return claims
+                    fc_data = await timed_lane("lane_a", lane_a(), lanes)
                     
                     # If Lane A fails, try Lane B fallback
                     if not fc_data:
                         print("Worker: Lane A empty. Falling back to Lane B (News)...")
                         nf = NewsFetcher()
-                        news_data = nf.search_news(text, max_results=30)
+                        news_data = await timed_lane("lane_b", nf.search_news_async(text, max_results=30), lanes)
                         if news_data: new_data.extend(news_data)
 
                 # Lane B: General News (Events)
                 elif route == "lane_b" or (is_safety_critical and not new_data):
                     print("Worker: Running Lane B (Trusted News)...")
                     nf = NewsFetcher()
-                    news_data = nf.search_news(text, max_results=30)
+                    news_data = await timed_lane("lane_b", nf.search_news_async(text, max_results=30), lanes)
                     if news_data: 
                         print(f"Worker: Lane B found {len(news_data)} items.")
                         new_data.extend(news_data)
@@ -124,21 +343,25 @@ def analyze_text_task(self, text, claim_id=None):
                 
                 if new_data:
                     print(f"Worker: Ingesting {len(new_data)} items...")
-                    await save_claims(new_data)
-                    # Wait for ChromaDB to index the new vectors
-                    print("Worker: Waiting 5s for indexing...")
-                    await asyncio.sleep(5) 
-                    return True
+                    fresh.extend(await save_claims(new_data))
+                
+                if new_data or fc_data:
+                    # Fresh vectors are merged into retrieval directly; only wait while
+                    # the store's query path can't find the new documents yet
+                    await wait_for_indexing(fresh)
+                    return fresh
                 
                 print("Worker: Deep Fetch found NO data in any lane.")
-                return False
+                return None
 
-            # Run Ingestion
-            got_new_data = asyncio.run(run_smart_fetch())
+            # Run Ingestion (None = nothing fetched; a list = freshly embedded documents)
+            with timings.span("smart_fetch"):
+                fresh_docs = asyncio.run(run_smart_fetch())
             
-            if got_new_data:
+            if fresh_docs is not None:
                 print("Worker: Re-running retrieval...")
-                raw_evidence = retriever.retrieve(text)
+                with timings.span("retrieval_refresh"):
+                    raw_evidence = retriever.retrieve(text, fresh=fresh_docs)
                 
                 # Dynamic Relaxation Loop — TIGHTENED thresholds
                 # Previous: [1.2, 1.4, 1.6] — way too loose, pulled unrelated articles
@@ -167,7 +390,25 @@ def analyze_text_task(self, text, claim_id=None):
         except Exception as e:
             print(f"Worker: Smart Fetch failed: {e}")
             import traceback
-            traceback.print_exc() 
+            traceback.print_exc()
+
+    return {
+        "evidence": evidence_list,
+        "original_count": original_count,
+        "is_safety_critical": is_safety_critical,
+        "quality_note": quality_note,
+        "fetch": fetch_meta if should_fetch else None,
+        "timings": timings.spans
+    }
+
+def score_stage(fetched, text, progress):
+    """Relevance gating, stance scoring (+ deep fetch when all neutral) and diversity re-ranking."""
+    stylometer, retriever, nli, xai, reputation = get_models()
+    evidence_list = fetched["evidence"]
+    original_count = fetched["original_count"]
+    is_safety_critical = fetched["is_safety_critical"]
+    quality_note = fetched["quality_note"]
+    timings = Timings(fetched.get("timings"))
     
     insufficient_evidence = False
     
@@ -196,11 +437,14 @@ def analyze_text_task(self, text, claim_id=None):
         
     evidence_list = unique_evidence
     
-    for ev in evidence_list:
-        # NEW: Topical relevance check BEFORE stance classification
-        # This prevents "Iran attacked Israel" from being used as evidence 
-        # for/against "Russia attacked Ukraine"
-        is_relevant, relevance_score = nli.is_topically_relevant(text, ev['text'])
+    # NEW: Topical relevance check BEFORE stance classification
+    # This prevents "Iran attacked Israel" from being used as evidence 
+    # for/against "Russia attacked Ukraine".
+    # Relevance and stance for every item are scored in one batched pass.
+    with timings.span("nli"):
+        relevance_results, stance_batch = nli.score_batch(text, [ev['text'] for ev in evidence_list])
+    
+    for ev, (is_relevant, relevance_score), stance in zip(evidence_list, relevance_results, stance_batch):
         ev['relevance_score'] = relevance_score
         
         if not is_relevant:
@@ -208,7 +452,6 @@ def analyze_text_task(self, text, claim_id=None):
             skipped_irrelevant += 1
             continue
         
-        stance = nli.predict(text, ev['text'])
         ev['stance'] = stance
         
         # Check source credibility
@@ -216,6 +459,7 @@ def analyze_text_task(self, text, claim_id=None):
         ev['credibility'] = reputation.check(source_url)
         
         stance_results.append(ev)
+        progress.emit("stance", evidence=ev)
         
         if stance['label'] == 'supports':
             supports_count += 1
@@ -231,50 +475,54 @@ def analyze_text_task(self, text, claim_id=None):
     # If we have evidence, but it's ALL Neutral, force a deeper search
     if len(stance_results) > 0 and refutes_count == 0 and supports_count == 0:
         print(f"Worker: Evidence found but ALL NEUTRAL. Triggering Deep Search for Stance.")
+        progress.emit("fetch_started", route="deep", priorities=["lane_a", "lane_b"], speculative=False)
         
         try:
             from ml.core.router import EvidenceRouter
-            from ml.ingest import fetch_claims, save_claims
+            from ml.ingest import stream_claims, ingest_stream, save_claims
             from ml.core.news_fetcher import NewsFetcher
             
             async def run_deep_fetch():
                 print("Worker: Deep Fetch running...")
-                new_data = []
                 
-                # 1. Try Fact Checks (Targeted)
-                fc = await fetch_claims(query=text)
-                if fc: new_data.extend(fc)
+                # 1. Try Fact Checks (Targeted) — saved page by page as they stream in
+                fc, fresh = await ingest_stream(stream_claims(query=text))
                 
                 # 2. Try News (Broad) — now fetches 30 instead of 10
                 nf = NewsFetcher()
-                news = nf.search_news(text, max_results=30)
-                if news: new_data.extend(news)
+                news = await nf.search_news_async(text, max_results=30)
+                if news:
+                    fresh.extend(await save_claims(news))
                 
-                if new_data:
-                    await save_claims(new_data)
-                    return True
-                return False
+                if fc or news:
+                    return fresh
+                return None
                 
-            got_new = asyncio.run(run_deep_fetch())
+            with timings.span("deep_fetch"):
+                fresh_docs = asyncio.run(run_deep_fetch())
             
-            if got_new:
+            if fresh_docs is not None:
                 print("Worker: Deep Fetch complete. Re-ranking...")
-                new_evidence = retriever.retrieve(text)
+                with timings.span("retrieval_refresh"):
+                    new_evidence = retriever.retrieve(text, fresh=fresh_docs)
                  
-                for ev in new_evidence:
+                new_evidence = [ev for ev in new_evidence if ev.get('url') not in seen_urls]
+                
+                # Apply relevance gating to deep-fetched evidence too
+                with timings.span("nli"):
+                    relevance_results, stance_batch = nli.score_batch(text, [ev['text'] for ev in new_evidence])
+                
+                for ev, (is_relevant, relevance_score), stance in zip(new_evidence, relevance_results, stance_batch):
                     if ev.get('url') in seen_urls: continue
-                    
-                    # Apply relevance gating to deep-fetched evidence too
-                    is_relevant, relevance_score = nli.is_topically_relevant(text, ev['text'])
                     if not is_relevant:
                         continue
                     
                     ev['relevance_score'] = relevance_score
-                    stance = nli.predict(text, ev['text'])
                     ev['stance'] = stance
                     ev['credibility'] = reputation.check(ev.get('url'))
                     
                     stance_results.append(ev)
+                    progress.emit("stance", evidence=ev)
                     if ev.get('url'): seen_urls.add(ev['url'])
                     
                     if stance['label'] == 'supports': supports_count += 1
@@ -308,7 +556,66 @@ def analyze_text_task(self, text, claim_id=None):
     
     # Update the final list
     ordered_evidence = diversified_results
+    
+    return {
+        "evidence": ordered_evidence,
+        "stance_summary": {
+            "supports": supports_count,
+            "refutes": refutes_count,
+            "neutral": neutral_count
+        },
+        "quality_note": quality_note,
+        "insufficient_evidence": insufficient_evidence,
+        "is_safety_critical": is_safety_critical,
+        "evidence_stats": {
+            "total_retrieved": original_count,
+            "after_threshold": len(evidence_list),
+            "skipped_irrelevant": skipped_irrelevant,
+            "final_with_stance": len(stance_results)
+        },
+        "nli_cache": nli.cache.stats(),
+        "embedding_cache": retriever.embedding_model.cache.stats(),
+        "resources": resources.stats(),
+        "fetch": fetched["fetch"],
+        "timings": timings.spans
+    }
 
+
+def aggregate_result(text, style, evidence, timings=None, started_at=None):
+    """
+    Merge stage outputs into the final result with the unified risk calculation.
+    Stage spans (from whichever process ran them) are combined into meta.timings (ms);
+    `started_at` (epoch seconds at submission pickup) adds the end-to-end "total".
+    """
+    timings = Timings(timings).merge(style.get("timings")).merge(evidence.get("timings"))
+    with timings.span("aggregate"):
+        result = _aggregate(text, style, evidence)
+    if started_at is not None:
+        timings.spans["total"] = time.time() - started_at
+    result["meta"]["timings"] = timings.as_ms()
+    result["meta"]["heatmap"] = {
+        "mode": style.get("heatmap_mode", "eager"),
+        "endpoint": "/api/heatmap",
+        "methods": list(heatmaps.METHODS)
+    }
+    result["meta"]["stylometry"] = {
+        "tier": style.get("tier", "model"),
+        "model_loaded": style.get("model_loaded", True)
+    }
+    return result
+
+def _aggregate(text, style, evidence):
+    style_risk = style["score"]
+    heatmap = style["heatmap"]
+    ordered_evidence = evidence["evidence"]
+    stance_results = ordered_evidence
+    supports_count = evidence["stance_summary"]["supports"]
+    refutes_count = evidence["stance_summary"]["refutes"]
+    neutral_count = evidence["stance_summary"]["neutral"]
+    quality_note = evidence["quality_note"]
+    insufficient_evidence = evidence["insufficient_evidence"]
+    is_safety_critical = evidence["is_safety_critical"]
+    
     result = {
         "text": text,
         "style_risk_score": style_risk,
@@ -387,22 +694,135 @@ def analyze_text_task(self, text, claim_id=None):
     result["quality_note"] = quality_note if not insufficient_evidence else "Insufficient Evidence"
     
     # Add linguistic fields
-    result["linguistic_signals"] = style_analysis.get("signals", [])
-    result["linguistic_verdict"] = style_analysis.get("verdict", "")
+    result["linguistic_signals"] = style.get("signals", [])
+    result["linguistic_verdict"] = style.get("verdict", "")
 
     result["meta"] = {
         "app_version": "v1.0.0-beta",
         "model_type": "roberta-base+heuristics",
         "index_version": "chroma-v1",
-        "evidence_stats": {
-            "total_retrieved": original_count,
-            "after_threshold": len(evidence_list),
-            "skipped_irrelevant": skipped_irrelevant,
-            "final_with_stance": len(stance_results)
-        }
+        "evidence_stats": evidence["evidence_stats"],
+        # Reported by the process that ran retrieval/NLI (a different worker under the canvas)
+        "nli_cache": evidence["nli_cache"],
+        "embedding_cache": evidence["embedding_cache"],
+        "resources": evidence["resources"],
+        "fetch": evidence["fetch"]
     }
     
+    return result
+
+def run_pipeline(text, progress=None, timings=None, started_at=None):
+    """All stages in the calling process, uncached (inline mode and the bulk CLI)."""
+    progress = progress or ProgressPublisher(None, None)
+    started_at = started_at or time.time()
+    style = style_stage(text, progress)
+    evidence = evidence_stage(retrieval_stage(text, progress), text, progress)
+    return aggregate_result(text, style, evidence, timings, started_at)
+
+def publisher(job_id):
+    return ProgressPublisher(redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")), job_id)
+
+def store_result(job_id, text, result, claim_id=None):
+    r = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    
     # Cache result (TTL 1 hour)
-    r.setex(cache_key, 3600, json.dumps(result))
+    result["meta"]["cache"] = {"level": "miss"}
+    ResultCache(r, get_encoder()).set(text, result)
     
+    # Persist (write-behind) so /api/status still answers after Redis expires it
+    get_sink().submit(job_id, result, claim_id)
+
+@celery_app.task
+def heatmap_task(text, method="gradient"):
+    """Token saliency for the annotated-text view; cached per (method, text)."""
+    stylometer, retriever, nli, xai, reputation = get_models()
+    with metrics.STAGE_SECONDS.labels(f"heatmap_{method}").time():
+        heatmap, cost = xai.explain_with_cost(text, method)
+    entry = {"heatmap": heatmap, "method": method, "cost": cost}
+    try:
+        heatmaps.store(redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")), text, method, entry)
+    except redis.RedisError as e:
+        print(f"Worker: Could not cache heatmap: {e}")
+    return entry
+
+@celery_app.task
+def style_stage_task(text, job_id):
+    return style_stage(text, publisher(job_id))
+
+@celery_app.task
+def retrieval_stage_task(text, job_id):
+    return retrieval_stage(text, publisher(job_id))
+
+@celery_app.task
+def fetch_stage_task(retrieval, text, job_id):
+    return fetch_stage(retrieval, text, publisher(job_id))
+
+@celery_app.task
+def score_stage_task(fetched, text, job_id):
+    return score_stage(fetched, text, publisher(job_id))
+
+@celery_app.task
+def aggregate_analysis_task(stage_results, text, job_id, claim_id=None, timings=None, started_at=None):
+    # Chord header results arrive in header order: [style, evidence]
+    style, evidence = stage_results
+    result = aggregate_result(text, style, evidence, timings, started_at)
+    store_result(job_id, text, result, claim_id)
     return result
+
+@celery_app.task(bind=True)
+def analyze_text_task(self, text, claim_id=None):
+    """
+    Full async analysis pipeline.
+    
+    With ANALYSIS_CANVAS on (default), a cache miss is replaced by a chord:
+    stylometry runs on one worker process while retrieval+safety -> live fetch -> stance
+    scoring runs on others, and aggregate_analysis_task merges them. The chord takes over
+    this task's id, so the job id the client holds resolves to the aggregated result.
+    """
+    job_id = self.request.id
+    started_at = time.time()
+    timings = Timings()
+    
+    # 0. Caching Check (exact on normalized text, then semantic near-duplicates)
+    r = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    # Stage events for /api/stream/{job_id}; "final"/"failed" are sent from task_postrun
+    progress = ProgressPublisher(r, job_id)
+    result_cache = ResultCache(r, get_encoder())
+    with timings.span("cache_lookup"):
+        cached = result_cache.get(text)
+    metrics.CACHE_LOOKUPS.labels("result", cached["meta"]["cache"]["level"] if cached else "miss").inc()
+    if cached:
+        print(f"Worker: Returning cached result ({cached['meta']['cache']['level']} match)")
+        # This request only looked the result up; the cached stage spans belong to the original job
+        timings.spans["total"] = time.time() - started_at
+        cached["meta"]["timings"] = timings.as_ms()
+        get_sink().submit(job_id, cached, claim_id)
+        return cached
+    
+    if ANALYSIS_CANVAS and not self.request.is_eager:
+        # Stages keep the submission's priority; their queues come from task_routes
+        priority = (self.request.delivery_info or {}).get("priority")
+        opts = {"priority": priority} if priority is not None else {}
+        # Retrieval feeds fetch, fetch feeds scoring, so they are chained; stylometry is independent
+        pipeline = chord(
+            [
+                style_stage_task.s(text=text, job_id=job_id).set(**opts),
+                chain(
+                    retrieval_stage_task.s(text=text, job_id=job_id).set(**opts),
+                    fetch_stage_task.s(text=text, job_id=job_id).set(**opts),
+                    score_stage_task.s(text=text, job_id=job_id).set(**opts)
+                )
+            ],
+            aggregate_analysis_task.s(
+                text=text, job_id=job_id, claim_id=claim_id,
+                timings=timings.spans, started_at=started_at
+            ).set(**opts)
+        )
+        raise self.replace(pipeline)
+    
+    # Inline: same stages, one process
+    result = run_pipeline(text, progress, timings.spans, started_at)
+    store_result(job_id, text, result, claim_id)
+    return result
+
+STAGE_TASKS = (style_stage_task, retrieval_stage_task, fetch_stage_task, score_stage_task)